@@ -0,0 +1,27 @@
+"""add_drawer_foreign_key_indexes
+
+Revision ID: 7b2f6e0c91d4
+Revises: c4e1a9d27b13
+Create Date: 2026-10-16 10:03:27.561904
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2f6e0c91d4'
+down_revision = 'c4e1a9d27b13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # PostgreSQL does not index foreign key columns automatically;
+    # these back crud.get_drawer_bins and crud.get_user_drawers
+    op.create_index(op.f('ix_bins_drawer_id'), 'bins', ['drawer_id'], unique=False)
+    op.create_index(op.f('ix_drawers_owner_id'), 'drawers', ['owner_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_drawers_owner_id'), table_name='drawers')
+    op.drop_index(op.f('ix_bins_drawer_id'), table_name='bins')
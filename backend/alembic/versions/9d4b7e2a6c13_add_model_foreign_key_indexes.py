@@ -0,0 +1,36 @@
+"""add_model_foreign_key_indexes
+
+Revision ID: 9d4b7e2a6c13
+Revises: e3a5c8d1f920
+Create Date: 2026-10-16 16:40:12.204318
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4b7e2a6c13'
+down_revision = 'e3a5c8d1f920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Foreign keys used by the model listing, drawer deletes and the
+    # bin/baseplate file lookups
+    op.create_index(op.f('ix_bins_model_id'), 'bins', ['model_id'], unique=False)
+    op.create_index(op.f('ix_baseplates_model_id'), 'baseplates', ['model_id'], unique=False)
+    op.create_index(op.f('ix_baseplates_drawer_id'), 'baseplates', ['drawer_id'], unique=False)
+    # Expression index backing crud.get_model_file and friends, which filter on
+    # model_id plus upper(file_type) since stored types differ in case
+    op.execute(
+        "CREATE INDEX ix_generated_files_model_id_file_type "
+        "ON generated_files (model_id, (upper(file_type)))"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_generated_files_model_id_file_type', table_name='generated_files')
+    op.drop_index(op.f('ix_baseplates_drawer_id'), table_name='baseplates')
+    op.drop_index(op.f('ix_baseplates_model_id'), table_name='baseplates')
+    op.drop_index(op.f('ix_bins_model_id'), table_name='bins')
@@ -0,0 +1,31 @@
+"""add_models_dimension_index
+
+Revision ID: c4e1a9d27b13
+Revises: 2a364316e95a
+Create Date: 2026-10-16 09:12:44.318502
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1a9d27b13'
+down_revision = '2a364316e95a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Expression index backing crud.get_model_by_metadata, which filters on
+    # type plus CAST(model_metadata ->> '<key>' AS FLOAT) for each dimension
+    op.execute(
+        "CREATE INDEX ix_models_type_dims ON models ("
+        "type, "
+        "(CAST(model_metadata ->> 'width' AS FLOAT)), "
+        "(CAST(model_metadata ->> 'depth' AS FLOAT)), "
+        "(CAST(model_metadata ->> 'height' AS FLOAT)))"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_models_type_dims', table_name='models')
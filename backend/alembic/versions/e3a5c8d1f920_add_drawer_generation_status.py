@@ -0,0 +1,24 @@
+"""add_drawer_generation_status
+
+Revision ID: e3a5c8d1f920
+Revises: 7b2f6e0c91d4
+Create Date: 2026-10-16 14:21:09.318502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a5c8d1f920'
+down_revision = '7b2f6e0c91d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('drawers', sa.Column('generation_status', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('drawers', 'generation_status')
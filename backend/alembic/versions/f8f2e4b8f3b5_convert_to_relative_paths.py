@@ -7,7 +7,8 @@ Create Date: 2025-02-03 12:00:00.000000
 """
 from alembic import op
 import sqlalchemy as sa
-from pathlib import Path
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 # revision identifiers, used by Alembic
 revision = 'f8f2e4b8f3b5'
@@ -15,25 +16,84 @@ down_revision = '85e507dd8a08'
 branch_labels = None
 depends_on = None
 
+BATCH_SIZE = 1000
+# Set MIGRATION_WORKERS > 1 to rewrite disjoint id ranges on parallel connections
+MIGRATION_WORKERS = int(os.getenv("MIGRATION_WORKERS", "1"))
+
+POSTGRES_UPDATE = (
+    "UPDATE generated_files "
+    "SET file_path = regexp_replace(file_path, '^.*/', '') "
+    "WHERE file_path LIKE '/%'"
+)
+
 def upgrade() -> None:
     # Get connection
     conn = op.get_bind()
 
-    # Select all generated files
-    files = conn.execute(
-        sa.text('SELECT id, file_path FROM generated_files')
-    ).fetchall()
-
-    # Update each file path to be relative
-    for file_id, file_path in files:
-        if file_path and file_path.startswith('/'):
-            # Convert absolute path to relative
-            relative_path = Path(file_path).name
-            conn.execute(
-                sa.text('UPDATE generated_files SET file_path = :path WHERE id = :id'),
-                {"path": relative_path, "id": file_id}
+    # Strip everything up to the last '/' from absolute paths in a single
+    # set-based UPDATE instead of one round trip per row
+    if conn.dialect.name == 'postgresql':
+        if MIGRATION_WORKERS > 1:
+            _convert_paths_in_parallel(conn, MIGRATION_WORKERS)
+        else:
+            conn.execute(sa.text(POSTGRES_UPDATE))
+    elif conn.dialect.name == 'sqlite':
+        # SQLite has no regexp_replace; rtrim() with every non-'/' character
+        # leaves the directory prefix, whose length gives the basename offset
+        conn.execute(sa.text(
+            "UPDATE generated_files "
+            "SET file_path = substr(file_path, "
+            "length(rtrim(file_path, replace(file_path, '/', ''))) + 1) "
+            "WHERE file_path LIKE '/%'"
+        ))
+    else:
+        _convert_paths_in_python(conn)
+
+
+def _convert_paths_in_parallel(conn, workers: int) -> None:
+    """
+    Split the id space into one block per worker and update each block on its
+    own connection. The blocks commit independently of the migration's
+    transaction; the UPDATE is idempotent, so an interrupted run can be repeated.
+    """
+    min_id, max_id = conn.execute(
+        sa.text("SELECT min(id), max(id) FROM generated_files")
+    ).one()
+    if min_id is None:
+        return
+
+    step = (max_id - min_id) // workers + 1
+    blocks = [(low, min(low + step - 1, max_id)) for low in range(min_id, max_id + 1, step)]
+
+    def convert_block(block):
+        low, high = block
+        with conn.engine.begin() as worker_conn:
+            worker_conn.execute(
+                sa.text(POSTGRES_UPDATE + " AND id BETWEEN :low AND :high"),
+                {"low": low, "high": high}
             )
 
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # list() surfaces any exception raised in a worker
+        list(executor.map(convert_block, blocks))
+
+
+def _convert_paths_in_python(conn) -> None:
+    """Fallback for dialects without string functions we can rely on."""
+    # Stream only the absolute paths from the server in BATCH_SIZE partitions
+    # so the whole table is never materialized in memory at once
+    result = conn.execute(
+        sa.text("SELECT id, file_path FROM generated_files WHERE file_path LIKE '/%'")
+        .execution_options(stream_results=True, yield_per=BATCH_SIZE)
+    )
+
+    for partition in result.partitions():
+        # Issue each partition as one executemany instead of one execute per row
+        conn.execute(
+            sa.text('UPDATE generated_files SET file_path = :path WHERE id = :id'),
+            [{"path": file_path.rpartition('/')[2], "id": file_id} for file_id, file_path in partition]
+        )
+
 def downgrade() -> None:
     # Add downgrade logic if needed
     pass
\ No newline at end of file
@@ -0,0 +1,126 @@
+# backend/app/cache.py
+"""
+Cache of authenticated users keyed by token hash, so get_current_user can
+skip the users table on every request. Disabled unless REDIS_URL is set.
+
+Also holds a short-lived in-process cache of successful logins, so repeated
+logins skip the password hash check.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+
+from cachetools import TTLCache
+
+from .config import settings
+from . import models
+
+logger = logging.getLogger(__name__)
+
+_redis = None
+
+# (username, sha256(password)) -> (user id, password hash it matched), for
+# successful logins only
+_login_cache = TTLCache(maxsize=4096, ttl=30)
+
+# Columns cached for a user; hashed_password is deliberately left out
+USER_FIELDS = ("id", "username", "email", "first_name", "last_name", "created_at")
+
+
+def get_redis():
+    """Return the shared Redis client, or None when caching is disabled"""
+    global _redis
+    if _redis is None and settings.REDIS_URL:
+        import redis.asyncio as redis
+        _redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+    return _redis
+
+
+def token_key(token: str) -> str:
+    return "token:" + hashlib.sha256(token.encode()).hexdigest()
+
+
+def user_tokens_key(user_id: int) -> str:
+    return f"user:{user_id}:tokens"
+
+
+async def get_cached_user(token: str) -> Optional[models.User]:
+    """
+    Look up the user for a token. The returned User is not attached to a
+    session, so only its column attributes should be read.
+    """
+    client = get_redis()
+    if client is None:
+        return None
+    try:
+        cached = await client.get(token_key(token))
+    except Exception as e:
+        logger.warning(f"User cache lookup failed: {str(e)}")
+        return None
+    if cached is None:
+        return None
+
+    data = json.loads(cached)
+    if data.get("created_at"):
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return models.User(**data)
+
+
+async def cache_user(token: str, user: models.User, expires_at: int) -> None:
+    """Cache a user for a token until the token expires (expires_at is a Unix timestamp)"""
+    client = get_redis()
+    if client is None:
+        return
+    ttl = int(expires_at - datetime.now().timestamp())
+    if ttl <= 0:
+        return
+
+    data = {field: getattr(user, field) for field in USER_FIELDS}
+    if data["created_at"] is not None:
+        data["created_at"] = data["created_at"].isoformat()
+
+    key = token_key(token)
+    try:
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.set(key, json.dumps(data), ex=ttl)
+            # Remember the key so it can be dropped when the user changes
+            pipe.sadd(user_tokens_key(user.id), key)
+            pipe.expire(user_tokens_key(user.id), ttl)
+            await pipe.execute()
+    except Exception as e:
+        logger.warning(f"User cache write failed: {str(e)}")
+
+
+def _login_key(username: str, password: str):
+    return username, hashlib.sha256(password.encode()).digest()
+
+
+def get_cached_login(username: str, password: str) -> Optional[Tuple[int, str]]:
+    """
+    (user id, password hash) of a recent successful login with these
+    credentials, if any. The hit only counts if the hash still matches the
+    user's row: invalidate_user clears this process only, and other workers
+    keep their entries.
+    """
+    return _login_cache.get(_login_key(username, password))
+
+
+def cache_login(username: str, password: str, user_id: int, hashed_password: str) -> None:
+    _login_cache[_login_key(username, password)] = (user_id, hashed_password)
+
+
+async def invalidate_user(user_id: int) -> None:
+    """Drop every cached token and login for a user, e.g. after a password or profile change"""
+    for key in [key for key, (cached_id, _) in _login_cache.items() if cached_id == user_id]:
+        _login_cache.pop(key, None)
+
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        keys = await client.smembers(user_tokens_key(user_id))
+        await client.delete(*keys, user_tokens_key(user_id))
+    except Exception as e:
+        logger.warning(f"User cache invalidation failed: {str(e)}")
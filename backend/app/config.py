@@ -5,5 +5,19 @@ class Settings:
     BASE_DIR = Path(__file__).resolve().parent.parent
     MODEL_OUTPUT_DIR = os.getenv("MODEL_OUTPUT_DIR", str(BASE_DIR / "model-output"))
     MODEL_OUTPUT_URL_PATH = "/files"
+    # Public base URL of the API; when set, file URLs are built from it instead of each request's host
+    BASE_URL = os.getenv("BASE_URL")
+    FILES_PREFIX = f"{BASE_URL.rstrip('/')}{MODEL_OUTPUT_URL_PATH}/" if BASE_URL else None
+    # Behind nginx, set to an internal location aliased to MODEL_OUTPUT_DIR (e.g. "/internal-files/");
+    # model files are then sent by nginx via X-Accel-Redirect instead of being read by the app
+    FILES_ACCEL_REDIRECT = os.getenv("FILES_ACCEL_REDIRECT")
+    # Development mode: crud queries raise on any relationship that was not eager-loaded
+    DEBUG = os.getenv("DEBUG", "false").lower() in ("1", "true", "yes")
+    # Redis for the authenticated-user cache; leave unset to disable it
+    REDIS_URL = os.getenv("REDIS_URL")
+    # Create missing tables at startup; otherwise the schema is managed by Alembic
+    INIT_DB = os.getenv("INIT_DB") == "1"
+    # Threads available to sync work (file I/O, sync dependencies); CAD work runs in its own process pool
+    THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", str(max(4, os.cpu_count() or 1))))
 
 settings = Settings()
\ No newline at end of file
@@ -1,26 +1,51 @@
 # backend/app/crud.py
-from sqlalchemy.orm import Session
-from . import models, schemas
-from app.utils.password import get_password_hash
+from sqlalchemy import and_, delete, func, insert, literal_column, or_, select, union_all, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from starlette.concurrency import run_in_threadpool
+from . import cache, models, schemas
+from .config import settings
+from app.utils.password import get_password_hash, verify_password
 from typing import List, Optional, Dict, Any
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_user(db: Session, user_id: int) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.id == user_id).first()
-
-def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.email == email).first()
-
-def get_user_by_username(db: Session, username: str) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.username == username).first()
-
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+def _eager(*options):
+    """
+    Loader options for a query. In DEBUG mode every relationship not listed
+    is set to raise on access, so a new lazy load (N+1) fails loudly.
+    """
+    if settings.DEBUG:
+        return [*options, raiseload('*')]
+    return list(options)
+
+# Metadata keys that identify a reusable model of each type
+DIMENSION_KEYS = {
+    "bin": ("width", "depth", "height"),
+    "baseplate": ("width", "depth"),
+}
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    # Session.get checks the identity map first, so repeat lookups within a request skip SQL
+    return await db.get(models.User, user_id)
+
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.email == email).limit(1))
+
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[models.User]:
+    return await db.scalar(select(models.User).where(models.User.username == username).limit(1))
+
+async def get_users(db: AsyncSession, after_id: int = 0, limit: int = 100) -> List[models.User]:
+    """Keyset pagination: pass the id of the last user from the previous page as after_id"""
+    result = await db.scalars(
+        select(models.User).where(models.User.id > after_id).order_by(models.User.id).limit(limit)
+    )
+    return result.all()
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
-    hashed_password = get_password_hash(user.password)
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
+    # bcrypt is slow on purpose; hash in the threadpool, not on the event loop
+    hashed_password = await run_in_threadpool(get_password_hash, user.password)
     db_user = models.User(
         email=user.email,
         username=user.username,
@@ -29,25 +54,147 @@ def create_user(db: Session, user: schemas.UserCreate) -> models.User:
         last_name=user.last_name
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def get_drawer(db: Session, drawer_id: int) -> Optional[models.Drawer]:
-    return db.query(models.Drawer).filter(models.Drawer.id == drawer_id).first()
+async def user_owns_drawer(db: AsyncSession, drawer_id: int, user_id: int) -> bool:
+    """
+    Whether a drawer exists and belongs to user_id. Reads only the owner
+    column by primary key, so no drawer object is loaded.
+    """
+    owner_id = await db.scalar(select(models.Drawer.owner_id).where(models.Drawer.id == drawer_id))
+    return owner_id == user_id
+
+async def get_drawer(
+    db: AsyncSession,
+    drawer_id: int,
+    eager: bool = False,
+    owner_id: Optional[int] = None
+) -> Optional[models.Drawer]:
+    """
+    Get a drawer; pass eager=True when the caller will read its bins and baseplates.
+    With owner_id, a drawer owned by someone else is not returned, so the
+    ownership check costs no extra query.
+    """
+    options = []
+    if eager:
+        options = [
+            selectinload(models.Drawer.bins),
+            selectinload(models.Drawer.baseplates)
+        ]
+    if owner_id is None:
+        return await db.get(models.Drawer, drawer_id, options=options)
+    return await db.scalar(
+        select(models.Drawer).options(*options).where(
+            models.Drawer.id == drawer_id,
+            models.Drawer.owner_id == owner_id
+        ).limit(1)
+    )
+
+# Columns returned for each drawer and each of its bins by get_user_drawers
+DRAWER_LIST_COLUMNS = ("id", "name", "width", "depth", "height", "owner_id", "created_at")
+BIN_LIST_COLUMNS = (
+    "id", "name", "width", "depth", "height", "is_standard",
+    "drawer_id", "model_id", "x_position", "y_position", "created_at"
+)
 
-def get_user_drawers(db: Session, user_id: int) -> List[models.Drawer]:
-    return db.query(models.Drawer).filter(models.Drawer.owner_id == user_id).all()
+async def get_user_drawers(db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+    """
+    A user's drawers as plain dicts, each with a "bins" list. One LEFT JOIN
+    reads everything and rows are grouped in Python, so no ORM objects are built.
+    """
+    drawers = models.Drawer.__table__
+    bins = models.Bin.__table__
+    result = await db.execute(
+        select(
+            *(drawers.c[column] for column in DRAWER_LIST_COLUMNS),
+            *(bins.c[column].label(f"bin_{column}") for column in BIN_LIST_COLUMNS)
+        )
+        .select_from(drawers.outerjoin(bins, bins.c.drawer_id == drawers.c.id))
+        .where(drawers.c.owner_id == user_id)
+        .order_by(drawers.c.id, bins.c.id)
+    )
 
-def create_drawer(db: Session, drawer: schemas.DrawerCreate, user_id: int) -> models.Drawer:
+    drawer_list = {}
+    for row in result.mappings():
+        drawer = drawer_list.get(row["id"])
+        if drawer is None:
+            drawer = drawer_list[row["id"]] = {column: row[column] for column in DRAWER_LIST_COLUMNS}
+            drawer["bins"] = []
+        if row["bin_id"] is not None:
+            drawer["bins"].append({column: row[f"bin_{column}"] for column in BIN_LIST_COLUMNS})
+    return list(drawer_list.values())
+
+async def create_drawer(db: AsyncSession, drawer: schemas.DrawerCreate, user_id: int) -> models.Drawer:
     db_drawer = models.Drawer(**drawer.model_dump(), owner_id=user_id)
     db.add(db_drawer)
-    db.commit()
-    db.refresh(db_drawer)
+    await db.commit()
+    await db.refresh(db_drawer)
     return db_drawer
 
 
-def get_model_by_metadata(db: Session, model_type: str, metadata: Dict[str, Any]) -> Optional[models.Model]:
+async def get_model_file(db: AsyncSession, model_id: int, file_type: str) -> Optional[models.GeneratedFile]:
+    """First file of a type ("STL", "FCStd") for a model; file types are matched case-insensitively"""
+    return await db.scalar(
+        select(models.GeneratedFile).where(
+            models.GeneratedFile.model_id == model_id,
+            func.upper(models.GeneratedFile.file_type) == file_type.upper()
+        ).order_by(models.GeneratedFile.id).limit(1)
+    )
+
+
+async def get_baseplate_file(db: AsyncSession, baseplate_id: int, file_type: str):
+    """
+    A baseplate's model id and the path of its model's first file of a type,
+    in one query. Returns None if the baseplate does not exist; model_id or
+    file_path is None when the baseplate has no model or no such file.
+    """
+    result = await db.execute(
+        select(models.Baseplate.model_id, models.GeneratedFile.file_path)
+        .outerjoin(models.GeneratedFile, and_(
+            models.GeneratedFile.model_id == models.Baseplate.model_id,
+            func.upper(models.GeneratedFile.file_type) == file_type.upper()
+        ))
+        .where(models.Baseplate.id == baseplate_id)
+        .order_by(models.GeneratedFile.id)
+        .limit(1)
+    )
+    return result.first()
+
+
+async def get_model_files_by_type(db: AsyncSession, model_ids: List[int], file_type: str) -> Dict[int, models.GeneratedFile]:
+    """First file of a type for each of several models, keyed by model id, in one query"""
+    result = await db.scalars(
+        select(models.GeneratedFile).where(
+            models.GeneratedFile.model_id.in_(model_ids),
+            func.upper(models.GeneratedFile.file_type) == file_type.upper()
+        ).order_by(models.GeneratedFile.id)
+    )
+    files = {}
+    for file in result:
+        files.setdefault(file.model_id, file)
+    return files
+
+
+async def find_model_sources(db: AsyncSession, record_ids: List[int]):
+    """
+    Bins and baseplates (with a model) and models whose id is one of record_ids,
+    found with a single UNION query. Returns (kind, record_id, model_id) rows,
+    kind being "bin", "baseplate" or "model"; the caller picks among them.
+    """
+    sources = union_all(
+        select(literal_column("'bin'").label("kind"), models.Bin.id.label("record_id"), models.Bin.model_id)
+        .where(models.Bin.id.in_(record_ids), models.Bin.model_id.is_not(None)),
+        select(literal_column("'baseplate'"), models.Baseplate.id, models.Baseplate.model_id)
+        .where(models.Baseplate.id.in_(record_ids), models.Baseplate.model_id.is_not(None)),
+        select(literal_column("'model'"), models.Model.id, models.Model.id.label("model_id"))
+        .where(models.Model.id.in_(record_ids))
+    )
+    return (await db.execute(sources)).all()
+
+
+async def get_model_by_metadata(db: AsyncSession, model_type: str, metadata: Dict[str, Any]) -> Optional[models.Model]:
     """
     Find a model with matching type and metadata.
 
@@ -66,62 +213,42 @@ def get_model_by_metadata(db: Session, model_type: str, metadata: Dict[str, Any]
         raise ValueError("Model type and metadata are required")
 
     # Query models with same type
-    models_query = db.query(models.Model).filter(models.Model.type == model_type)
+    models_query = select(models.Model).options(*_eager()).where(models.Model.type == model_type)
 
     try:
-        # Handle bin models with specific dimension matching
-        if model_type == "bin" and all(k in metadata for k in ["width", "depth", "height"]):
-            # Get all models of this type
-            all_models = models_query.all()
-
-            # Extract dimensions we're looking for
-            width = metadata["width"]
-            depth = metadata["depth"]
-            height = metadata["height"]
-
-            logger.info(f"Searching for bin with dimensions: width={width}, depth={depth}, height={height}")
-
-            # Find matching models
-            matching_models = []
-            for model in all_models:
-                model_metadata = model.model_metadata
-                if (model_metadata.get("width") == width and
-                        model_metadata.get("depth") == depth and
-                        model_metadata.get("height") == height):
-                    matching_models.append(model)
-                    logger.info(f"Found matching bin model: id={model.id}")
-
-            if matching_models:
-                return matching_models[0]
-
-        # Handle baseplate models with specific dimension matching
-        elif model_type == "baseplate" and all(k in metadata for k in ["width", "depth"]):
-            # Get all models of this type
-            all_models = models_query.all()
-
-            # Extract dimensions we're looking for
-            width = metadata["width"]
-            depth = metadata["depth"]
-
-            logger.info(f"Searching for baseplate with dimensions: width={width}, depth={depth}")
-
-            # Find matching models
-            matching_models = []
-            for model in all_models:
-                model_metadata = model.model_metadata
-                if (model_metadata.get("width") == width and
-                        model_metadata.get("depth") == depth):
-                    matching_models.append(model)
-                    logger.info(f"Found matching baseplate model: id={model.id}")
-
-            if matching_models:
-                return matching_models[0]
+        # Handle bin and baseplate models with specific dimension matching.
+        # The comparison runs in the database so only a matching row is fetched.
+        dimension_keys = DIMENSION_KEYS.get(model_type)
+        if dimension_keys and all(k in metadata for k in dimension_keys):
+            logger.info(f"Searching for {model_type} with dimensions: "
+                        + ", ".join(f"{k}={metadata[k]}" for k in dimension_keys))
+
+            model = await db.scalar(models_query.where(*(
+                models.Model.model_metadata[k].as_float() == metadata[k]
+                for k in dimension_keys
+            )).limit(1))
+
+            if model:
+                logger.info(f"Found matching {model_type} model: id={model.id}")
+                return model
 
         # For other model types, try direct metadata comparison
         else:
-            for model in models_query.all():
-                if model.model_metadata == metadata:
-                    return model
+            # Only the id and metadata are needed to compare; load the full
+            # Model for the match alone
+            candidates = await db.stream(
+                select(models.Model.id, models.Model.model_metadata)
+                .where(models.Model.type == model_type)
+                .execution_options(yield_per=500)
+            )
+            match_id = None
+            async for model_id, model_metadata in candidates:
+                if model_metadata == metadata:
+                    match_id = model_id
+                    break
+            await candidates.close()
+            if match_id is not None:
+                return await db.get(models.Model, match_id)
 
         # No matching model found
         logger.info(f"No matching {model_type} model found")
@@ -138,26 +265,26 @@ def get_model_by_metadata(db: Session, model_type: str, metadata: Dict[str, Any]
         logger.error(f"Error in get_model_by_metadata: {str(e)}")
         return None
 
-def create_model(db: Session, model: schemas.ModelCreate) -> models.Model:
+async def create_model(db: AsyncSession, model: schemas.ModelCreate) -> models.Model:
     """Create a new model"""
     db_model = models.Model(**model.model_dump())
     db.add(db_model)
-    db.commit()
-    db.refresh(db_model)
+    await db.commit()
+    await db.refresh(db_model)
     return db_model
 
-def get_or_create_model(db: Session, model_type: str, metadata: Dict[str, Any]) -> models.Model:
+async def get_or_create_model(db: AsyncSession, model_type: str, metadata: Dict[str, Any]) -> models.Model:
     """Get an existing model or create a new one if it doesn't exist"""
     # Check if model already exists
-    existing_model = get_model_by_metadata(db, model_type, metadata)
+    existing_model = await get_model_by_metadata(db, model_type, metadata)
     if existing_model:
         return existing_model
     
     # If not, create a new model
     model_create = schemas.ModelCreate(type=model_type, model_metadata=metadata)
-    return create_model(db, model_create)
+    return await create_model(db, model_create)
 
-def create_bin(db: Session, bin: schemas.BinCreate) -> models.Bin:
+async def create_bin(db: AsyncSession, bin: schemas.BinCreate) -> models.Bin:
     # Create the bin
     bin_data = bin.model_dump()
     
@@ -166,151 +293,185 @@ def create_bin(db: Session, bin: schemas.BinCreate) -> models.Bin:
     
     db_bin = models.Bin(**bin_data, model_id=model_id)
     db.add(db_bin)
-    db.commit()
-    db.refresh(db_bin)
+    await db.commit()
+    await db.refresh(db_bin)
     return db_bin
 
-def update_bin_model(db: Session, bin_id: int, model_id: int) -> Optional[models.Bin]:
+async def update_bin_model(db: AsyncSession, bin_id: int, model_id: int) -> Optional[models.Bin]:
     """Update a bin's model reference"""
-    db_bin = db.query(models.Bin).filter(models.Bin.id == bin_id).first()
-    if db_bin:
-        db_bin.model_id = model_id
-        db.commit()
-        db.refresh(db_bin)
-        return db_bin
-    return None
-
-def get_drawer_bins(db: Session, drawer_id: int) -> List[models.Bin]:
-    return db.query(models.Bin).filter(models.Bin.drawer_id == drawer_id).all()
-
-def delete_drawer(db: Session, drawer_id: int) -> bool:
-    drawer = get_drawer(db, drawer_id)
-    if drawer:
-        db.delete(drawer)
-        db.commit()
-        return True
-    return False
+    db_bin = (await db.scalars(
+        update(models.Bin)
+        .where(models.Bin.id == bin_id)
+        .values(model_id=model_id)
+        .returning(models.Bin)
+    )).one_or_none()
+    await db.commit()
+    return db_bin
 
-def update_drawer(
-    db: Session,
+async def get_drawer_bins(db: AsyncSession, drawer_id: int) -> List[models.Bin]:
+    # Many-to-one, so a JOIN adds no row explosion
+    result = await db.scalars(
+        select(models.Bin).options(*_eager(
+            joinedload(models.Bin.model)
+        )).where(models.Bin.drawer_id == drawer_id)
+    )
+    return result.all()
+
+def _drawer_filter(drawer_id: int, owner_id: Optional[int]):
+    conditions = [models.Drawer.id == drawer_id]
+    if owner_id is not None:
+        conditions.append(models.Drawer.owner_id == owner_id)
+    return conditions
+
+async def delete_drawer(db: AsyncSession, drawer_id: int, owner_id: Optional[int] = None) -> bool:
+    """Delete a drawer, restricted to owner_id's drawers when given. Returns False if nothing matched."""
+    # Detach child rows the same way the ORM delete did (drawer_id set to NULL),
+    # then delete server-side without loading the drawer or its children.
+    # All three statements share one transaction.
+    matching_drawer = select(models.Drawer.id).where(*_drawer_filter(drawer_id, owner_id))
+    await db.execute(update(models.Bin).where(models.Bin.drawer_id.in_(matching_drawer)).values(drawer_id=None))
+    await db.execute(update(models.Baseplate).where(models.Baseplate.drawer_id.in_(matching_drawer)).values(drawer_id=None))
+    result = await db.execute(delete(models.Drawer).where(*_drawer_filter(drawer_id, owner_id)))
+    await db.commit()
+    return result.rowcount > 0
+
+async def update_drawer(
+    db: AsyncSession,
     drawer_id: int,
-    drawer_update: schemas.DrawerCreate
+    drawer_update: schemas.DrawerCreate,
+    owner_id: Optional[int] = None
 ) -> Optional[models.Drawer]:
-    db_drawer = get_drawer(db, drawer_id)
-    if db_drawer:
-        for key, value in drawer_update.model_dump().items():
-            setattr(db_drawer, key, value)
-        db.commit()
-        db.refresh(db_drawer)
-        return db_drawer
-    return None
+    # Single UPDATE ... RETURNING instead of load, setattr and refresh;
+    # returns None when no drawer (owned by owner_id, if given) matched
+    db_drawer = (await db.scalars(
+        update(models.Drawer)
+        .where(*_drawer_filter(drawer_id, owner_id))
+        .values(**drawer_update.model_dump())
+        .returning(models.Drawer)
+    )).one_or_none()
+    await db.commit()
+    return db_drawer
     
-def update_user(
-    db: Session,
+async def update_user(
+    db: AsyncSession,
     user_id: int,
     user_update: schemas.UserUpdate
 ) -> Optional[models.User]:
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id)
     if db_user:
         update_data = user_update.model_dump(exclude_unset=True)
         
-        # Check if username is being updated and it's not already taken
+        # Check that a changed username or email is not already taken,
+        # using one query for both
+        conflict_conditions = []
         if 'username' in update_data and update_data['username'] != db_user.username:
-            existing_user = get_user_by_username(db, update_data['username'])
-            if existing_user:
-                return None  # Username already taken
-        
-        # Check if email is being updated and it's not already taken
+            conflict_conditions.append(models.User.username == update_data['username'])
         if 'email' in update_data and update_data['email'] != db_user.email:
-            existing_user = get_user_by_email(db, update_data['email'])
-            if existing_user:
-                return None  # Email already taken
+            conflict_conditions.append(models.User.email == update_data['email'])
+
+        if conflict_conditions:
+            conflicting_id = await db.scalar(
+                select(models.User.id).where(
+                    models.User.id != user_id,
+                    or_(*conflict_conditions)
+                ).limit(1)
+            )
+            if conflicting_id is not None:
+                return None  # Username or email already taken
         
         for key, value in update_data.items():
             setattr(db_user, key, value)
             
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await cache.invalidate_user(user_id)
+        await db.refresh(db_user)
         return db_user
     return None
     
-def change_user_password(
-    db: Session,
+async def change_user_password(
+    db: AsyncSession,
     user_id: int,
     current_password: str,
     new_password: str
 ) -> bool:
-    from app.utils.password import verify_password, get_password_hash
-    
-    db_user = get_user(db, user_id)
+    db_user = await get_user(db, user_id)
     if not db_user:
         return False
         
-    if not verify_password(current_password, db_user.hashed_password):
+    if not await run_in_threadpool(verify_password, current_password, db_user.hashed_password):
         return False
         
-    db_user.hashed_password = get_password_hash(new_password)
-    db.commit()
+    db_user.hashed_password = await run_in_threadpool(get_password_hash, new_password)
+    await db.commit()
+    # Tokens issued before the change must go back to the database
+    await cache.invalidate_user(user_id)
     return True
 
-def update_drawer_bins(
-    db: Session, 
+async def update_drawer_bins(
+    db: AsyncSession, 
     drawer_id: int, 
     bins_data: List[schemas.BinUpdate]
 ) -> List[models.Bin]:
     """Update all bins for a drawer - removes existing bins and creates new ones"""
     
-    # Delete all existing bins for this drawer
-    db.query(models.Bin).filter(models.Bin.drawer_id == drawer_id).delete()
-    db.flush()
-    
-    # Create new bins based on the input data
+    # Delete all existing bins for this drawer; the DELETE and the INSERT
+    # below share one transaction and are committed together
+    await db.execute(delete(models.Bin).where(models.Bin.drawer_id == drawer_id))
+
+    # Create new bins based on the input data in one batched INSERT;
+    # RETURNING hands back the populated Bin objects without a refresh per row
     updated_bins = []
-    for bin_data in bins_data:
-        new_bin = models.Bin(
-            drawer_id=drawer_id,
-            width=bin_data.width,
-            depth=bin_data.depth,
-            height=50.0,  # Default height
-            is_standard=True,  # Default to standard
-            x_position=bin_data.x_position,
-            y_position=bin_data.y_position
+    if bins_data:
+        result = await db.scalars(
+            insert(models.Bin).returning(models.Bin),
+            [
+                {
+                    "drawer_id": drawer_id,
+                    "width": bin_data.width,
+                    "depth": bin_data.depth,
+                    "height": 50.0,  # Default height
+                    "is_standard": True,  # Default to standard
+                    "x_position": bin_data.x_position,
+                    "y_position": bin_data.y_position
+                }
+                for bin_data in bins_data
+            ]
         )
-        db.add(new_bin)
-        updated_bins.append(new_bin)
-    
-    db.commit()
-    
-    # Refresh all the bin objects to get their IDs
-    for bin_obj in updated_bins:
-        db.refresh(bin_obj)
-        
+        updated_bins = result.all()
+
+    await db.commit()
     return updated_bins
 
-def get_user_settings(db: Session, user_id: int) -> Optional[models.UserSettings]:
+async def get_user_settings(db: AsyncSession, user_id: int) -> Optional[models.UserSettings]:
     """Get user settings for a specific user"""
-    return db.query(models.UserSettings).filter(models.UserSettings.user_id == user_id).first()
+    return await db.scalar(select(models.UserSettings).where(models.UserSettings.user_id == user_id).limit(1))
 
-def create_user_settings(db: Session, user_id: int, settings: schemas.UserSettingsCreate) -> models.UserSettings:
+async def create_user_settings(db: AsyncSession, user_id: int, settings: schemas.UserSettingsCreate) -> models.UserSettings:
     """Create new user settings"""
     db_settings = models.UserSettings(**settings.model_dump(), user_id=user_id)
     db.add(db_settings)
-    db.commit()
-    db.refresh(db_settings)
+    await db.commit()
+    await db.refresh(db_settings)
     return db_settings
 
-def update_user_settings(db: Session, user_id: int, settings: schemas.UserSettingsUpdate) -> Optional[models.UserSettings]:
+async def update_user_settings(db: AsyncSession, user_id: int, settings: schemas.UserSettingsUpdate) -> Optional[models.UserSettings]:
     """Update user settings"""
-    db_settings = get_user_settings(db, user_id)
-    
+    update_data = settings.model_dump(exclude_unset=True)
+
+    # Update existing settings in place, returning the updated row
+    if update_data:
+        db_settings = (await db.scalars(
+            update(models.UserSettings)
+            .where(models.UserSettings.user_id == user_id)
+            .values(**update_data)
+            .returning(models.UserSettings)
+        )).one_or_none()
+    else:
+        db_settings = await get_user_settings(db, user_id)
+
     if not db_settings:
         # If settings don't exist yet, create them
-        return create_user_settings(db, user_id, settings)
-    
-    # Update existing settings
-    for key, value in settings.model_dump(exclude_unset=True).items():
-        setattr(db_settings, key, value)
-    
-    db.commit()
-    db.refresh(db_settings)
-    return db_settings
\ No newline at end of file
+        return await create_user_settings(db, user_id, settings)
+
+    await db.commit()
+    return db_settings
@@ -1,14 +1,18 @@
 from pathlib import Path
 import sys
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse, FileResponse, RedirectResponse
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi.responses import FileResponse, ORJSONResponse, RedirectResponse, Response
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import List, Optional
+from app.services import cad_worker
 from app.services.model_service import ModelService
-from . import crud, models, schemas
-from .database import SessionLocal, engine
+from . import config, crud, models, schemas
+from .database import SessionLocal, engine, get_db, warm_pool
+from .middleware import FILE_ROUTE_PREFIXES, CacheControlMiddleware, QueryFilterMiddleware, SelectiveGZipMiddleware
 from .models import Drawer
 from .security import (
     authenticate_user,
@@ -17,24 +21,33 @@ from .security import (
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from datetime import timedelta
+from functools import lru_cache
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from app.services.bin_generation_service import BinGenerationService
 from app.services.baseplate_generator_service import BaseplateService
-from fastapi import Request
 from fastapi.staticfiles import StaticFiles
-from core.gridfinity_baseplate import GridfinityBaseplate
-from core.gridfinity_config import GridfinityConfig
-from starlette.middleware.base import BaseHTTPMiddleware
+import anyio.to_thread
+import asyncio
+import atexit
+import os
 import logging
 import logging.handlers
+import queue
+
+# Records held before a file write, and the longest they wait to be written
+LOG_BUFFER_CAPACITY = 1024
+LOG_FLUSH_INTERVAL = 30
+LOG_DIR = Path(__file__).parents[2] / "logs"
+# Kept as a str; the rotating handler works with the path as a string
+LOG_FILE = os.fspath(LOG_DIR / "drawerfinity.log")
 
 # Configure logging
 def setup_logging():
     # Create logs directory if it doesn't exist
-    log_dir = Path(__file__).parents[2] / "logs"
-    log_dir.mkdir(exist_ok=True)
-    log_file = log_dir / "drawerfinity.log"
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_file = LOG_FILE
     
     # Create formatters
     file_formatter = logging.Formatter(
@@ -51,6 +64,11 @@ def setup_logging():
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(file_formatter)
+    # Batch file writes; errors are written straight away along with everything buffered before them
+    buffered_file_handler = logging.handlers.MemoryHandler(
+        LOG_BUFFER_CAPACITY, flushLevel=logging.ERROR, target=file_handler, flushOnClose=True
+    )
+    buffered_file_handler.setLevel(logging.DEBUG)
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
@@ -65,47 +83,106 @@ def setup_logging():
     for handler in root_logger.handlers[:]:
         root_logger.removeHandler(handler)
     
-    # Add the new handlers
-    root_logger.addHandler(file_handler)
-    root_logger.addHandler(console_handler)
+    # Log calls only enqueue the record; a listener thread does the file and
+    # console writes, so request handlers never wait on I/O
+    log_queue = queue.SimpleQueue()
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(
+        log_queue, buffered_file_handler, console_handler, respect_handler_level=True
+    )
+    listener.start()
+    # CAD worker processes log through their own queue into the same handlers
+    cad_worker.start_log_listener(buffered_file_handler, console_handler)
+    # Flush queued records when the process exits; stopping the listeners
+    # first lets the buffered handler receive the last records before it closes
+    atexit.register(buffered_file_handler.close)
+    atexit.register(listener.stop)
+    atexit.register(cad_worker.stop_log_listener)
     
-    # Return application logger
-    return logging.getLogger(__name__)
+    # Return application logger and the buffer to flush periodically
+    return logging.getLogger(__name__), buffered_file_handler
+
+async def flush_log_buffer_periodically():
+    """Write buffered log records at least every LOG_FLUSH_INTERVAL seconds, even when idle"""
+    while True:
+        await asyncio.sleep(LOG_FLUSH_INTERVAL)
+        log_buffer.flush()
 
 # Initialize logger
-logger = setup_logging()
+logger, log_buffer = setup_logging()
 logger.info("Logging system initialized")
 
-class QueryFilterMiddleware(BaseHTTPMiddleware):
-    """Middleware to filter out problematic query parameters."""
-    
-    async def dispatch(self, request: Request, call_next):
-        # Create a copy of the original request
-        scope = request.scope.copy()
-        
-        # Get and filter query parameters
-        query_params = []
-        for param_name, param_value in request.query_params.items():
-            # Skip problematic parameters
-            if param_name == "local_kw":
-                logger.info(f"Filtering out query parameter: {param_name}={param_value}")
-                continue
-            query_params.append((param_name.encode(), param_value.encode()))
-        
-        # Replace query parameters in the scope
-        scope["query_string"] = b"&".join(b"=".join(param) for param in query_params)
-        
-        # Create a new request with filtered query parameters
-        filtered_request = Request(scope=scope, receive=request.receive)
-        
-        # Process the request with filtered parameters
-        response = await call_next(filtered_request)
-        return response
+# Generated model files are stored here and served under /files; resolved once,
+# so request handlers only join stored relative paths onto it
+MODEL_OUTPUT_DIR = Path(config.settings.MODEL_OUTPUT_DIR).resolve()
+MODEL_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+def model_file_stat(relative_path: str) -> Optional[os.stat_result]:
+    """stat() of a file under MODEL_OUTPUT_DIR, or None if it does not exist"""
+    try:
+        return os.stat(MODEL_OUTPUT_DIR / relative_path)
+    except FileNotFoundError:
+        return None
+
+def model_file_response(
+    relative_path: str,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+    stat_result: Optional[os.stat_result] = None
+) -> Response:
+    """
+    Response for a file under MODEL_OUTPUT_DIR. With FILES_ACCEL_REDIRECT set,
+    nginx sends the file (sendfile, no copy through Python); otherwise the app streams it.
+    Pass the stat_result from model_file_stat so the file is not stat'ed again.
+    """
+    accel_prefix = config.settings.FILES_ACCEL_REDIRECT
+    if accel_prefix:
+        headers = {"X-Accel-Redirect": accel_prefix.rstrip('/') + '/' + relative_path.lstrip('/')}
+        if filename:
+            headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return Response(headers=headers, media_type=media_type)
+    return FileResponse(
+        path=MODEL_OUTPUT_DIR / relative_path, filename=filename, media_type=media_type, stat_result=stat_result
+    )
+
+@lru_cache(maxsize=1)
+def get_bin_service() -> BinGenerationService:
+    # Services hold only configuration; the request's session is passed per call
+    return BinGenerationService(base_output_dir=MODEL_OUTPUT_DIR)
+
+@lru_cache(maxsize=1)
+def get_baseplate_service() -> BaseplateService:
+    return BaseplateService(base_output_dir=MODEL_OUTPUT_DIR)
 
-app = FastAPI(title="Gridfinity API")
+@lru_cache(maxsize=1)
+def get_model_service() -> ModelService:
+    return ModelService()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bound the threadpool that runs sync code, instead of anyio's default 40 threads
+    anyio.to_thread.current_default_thread_limiter().total_tokens = config.settings.THREADPOOL_SIZE
+
+    # Create database tables only when asked; each create_all inspects every
+    # table, which slows down every worker's startup
+    if config.settings.INIT_DB:
+        async with engine.begin() as conn:
+            await conn.run_sync(models.Base.metadata.create_all)
+
+    # Warm the database connection pool before serving requests
+    try:
+        await warm_pool()
+        logger.info("Database connection pool warmed")
+    except Exception as e:
+        logger.warning(f"Could not warm database connection pool: {str(e)}")
+    log_flush_task = asyncio.create_task(flush_log_buffer_periodically())
+    yield
+    log_flush_task.cancel()
+    log_buffer.flush()
+    cad_worker.shutdown_executor()
+
+# orjson serializes the list-heavy responses (drawers, models) much faster than json
+app = FastAPI(title="Gridfinity API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -117,7 +194,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     logger.error(f"Validation errors on path {request.url.path}: {error_details}")
     
     # Return the validation errors to the client
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={"detail": error_details},
     )
@@ -127,14 +204,29 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://localhost:3001", "http://localhost:8000", "http://192.168.86.51:3001"],  # Specific origins
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-    expose_headers=["*"]
+    # Explicit lists let Starlette build the preflight headers once, instead of
+    # echoing each request's Access-Control-Request-Headers back
+    allow_methods=["GET", "POST", "PUT", "DELETE"],
+    allow_headers=["Authorization", "Content-Type", "Accept"],
+    expose_headers=["Content-Disposition"]
 )
 
 # Add our query parameter filter middleware
 app.add_middleware(QueryFilterMiddleware)
-app.mount("/files", StaticFiles(directory="/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output"), name="files")
+# A model's files never change once generated, so browsers may reuse them
+app.add_middleware(CacheControlMiddleware, path_prefix="/files/")
+# Compress JSON responses; model files are mostly binary STL, which gains little
+# from gzip, so those routes are sent as-is
+app.add_middleware(
+    SelectiveGZipMiddleware, exclude_prefixes=FILE_ROUTE_PREFIXES, minimum_size=1024, compresslevel=5
+)
+if config.settings.FILES_ACCEL_REDIRECT:
+    @app.get("/files/{file_path:path}", include_in_schema=False)
+    async def serve_model_file(file_path: str):
+        return model_file_response(file_path)
+else:
+    # The directory is created at import, so skip StaticFiles' own startup check
+    app.mount("/files", StaticFiles(directory=MODEL_OUTPUT_DIR, check_dir=False), name="files")
 
 
 class BinGenerateRequest(BaseModel):
@@ -148,6 +240,9 @@ class GeneratedFileResponse(BaseModel):
     file_type: str
     file_path: str
 
+    class Config:
+        from_attributes = True
+
 class BinGenerateResponse(BaseModel):
     id: int
     name: str
@@ -196,46 +291,39 @@ class GenerateDrawerModelsRequest(BaseModel):
 class GenerateDrawerModelsResponse(BaseModel):
     message: str
     modelIds: list[str]
-
-# Dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    # Set for background generation; poll /drawers/{jobId}/generation-status
+    jobId: Optional[int] = None
 
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    print(f"Login attempt for user: {form_data.username}")
+    logger.debug("Login attempt for user: %s", form_data.username)
     
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
-        print(f"Authentication failed for user: {form_data.username}")
+        logger.info("Authentication failed for user: %s", form_data.username)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    print(f"Authentication successful for user: {form_data.username}")
+    logger.debug("Authentication successful for user: %s", form_data.username)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    print(f"Generated token for user {user.username}: {access_token[:10]}...")
     
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/users/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_email(db, email=user.email)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    return await crud.create_user(db=db, user=user)
 
 @app.get("/users/me/")
 async def read_users_me(
@@ -258,9 +346,9 @@ async def read_users_me(
 async def change_password(
     password_data: schemas.PasswordChange,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    success = crud.change_user_password(
+    success = await crud.change_user_password(
         db, 
         user_id=current_user.id,
         current_password=password_data.current_password,
@@ -279,9 +367,9 @@ async def change_password(
 async def update_profile(
     user_update: schemas.UserUpdate,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    updated_user = crud.update_user(db, current_user.id, user_update)
+    updated_user = await crud.update_user(db, current_user.id, user_update)
     if not updated_user:
         raise HTTPException(
             status_code=400,
@@ -289,163 +377,102 @@ async def update_profile(
         )
     return updated_user
 
-@app.post("/users/change-password/")
-async def change_password(
-    password_change: schemas.PasswordChange,
-    current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    success = crud.change_user_password(
-        db, 
-        current_user.id, 
-        password_change.current_password, 
-        password_change.new_password
-    )
-    
-    if not success:
-        raise HTTPException(
-            status_code=400,
-            detail="Current password is incorrect"
-        )
-    
-    return {"message": "Password changed successfully"}
-
 @app.post("/drawers/", response_model=schemas.Drawer)
-def create_drawer(
+async def create_drawer(
     drawer: schemas.DrawerCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    return crud.create_drawer(db=db, drawer=drawer, user_id=current_user.id)
+    return await crud.create_drawer(db=db, drawer=drawer, user_id=current_user.id)
 
-@app.get("/drawers/")
-def read_drawers(
+@app.get("/drawers/", response_model=None)
+async def read_drawers(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user),
     # Explicitly declare optional query parameters to prevent them from being
     # passed to other dependencies
     local_kw: str = None,
 ):
-    drawers = crud.get_user_drawers(db, user_id=current_user.id)
-    # Convert drawer objects to dict to avoid validation issues
-    drawer_list = []
-    for drawer in drawers:
-        drawer_dict = {
-            "id": drawer.id,
-            "name": drawer.name,
-            "width": drawer.width,
-            "depth": drawer.depth,
-            "height": drawer.height,
-            "owner_id": drawer.owner_id,
-            "created_at": drawer.created_at,
-            "bins": []
-        }
-        for bin in drawer.bins:
-            bin_dict = {
-                "id": bin.id,
-                "width": bin.width,
-                "depth": bin.depth, 
-                "height": bin.height,
-                "is_standard": bin.is_standard,
-                "drawer_id": bin.drawer_id,
-                "created_at": bin.created_at
-            }
-            drawer_dict["bins"].append(bin_dict)
-        drawer_list.append(drawer_dict)
-    return drawer_list
+    # Plain dicts from a single JOIN; returned as-is, without model validation
+    return ORJSONResponse(content=await crud.get_user_drawers(db, user_id=current_user.id))
 
 @app.get("/drawers/{drawer_id}", response_model=schemas.DrawerWithBins)
-def read_drawer(
+async def read_drawer(
     drawer_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    drawer = crud.get_drawer(db, drawer_id=drawer_id)
+    # Drawers owned by other users are reported as not found
+    drawer = await crud.get_drawer(db, drawer_id=drawer_id, eager=True, owner_id=current_user.id)
     if drawer is None:
         raise HTTPException(status_code=404, detail="Drawer not found")
-    if drawer.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to access this drawer")
     return drawer
 
 @app.post("/drawers/{drawer_id}/bins/", response_model=schemas.Bin)
-def create_bin_for_drawer(
+async def create_bin_for_drawer(
     drawer_id: int,
     bin: schemas.BinCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    drawer = crud.get_drawer(db, drawer_id=drawer_id)
-    if drawer is None:
+    if not await crud.user_owns_drawer(db, drawer_id=drawer_id, user_id=current_user.id):
         raise HTTPException(status_code=404, detail="Drawer not found")
-    if drawer.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this drawer")
     bin.drawer_id = drawer_id
-    return crud.create_bin(db=db, bin=bin)
+    return await crud.create_bin(db=db, bin=bin)
 
 @app.put("/drawers/{drawer_id}/bins", response_model=dict)
-def update_drawer_bins(
+async def update_drawer_bins(
     drawer_id: int,
     bin_data: schemas.BinUpdateList,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Update all bins for a drawer"""
     
     # Verify drawer exists and belongs to the user
-    drawer = crud.get_drawer(db, drawer_id=drawer_id)
-    if drawer is None:
+    if not await crud.user_owns_drawer(db, drawer_id=drawer_id, user_id=current_user.id):
         raise HTTPException(status_code=404, detail="Drawer not found")
-    if drawer.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this drawer")
     
     # Use the CRUD function to update bins
-    updated_bins = crud.update_drawer_bins(db, drawer_id=drawer_id, bins_data=bin_data.bins)
+    updated_bins = await crud.update_drawer_bins(db, drawer_id=drawer_id, bins_data=bin_data.bins)
     
     return {"message": "Bins updated successfully", "bin_count": len(updated_bins)}
 
 @app.delete("/drawers/{drawer_id}")
-def delete_drawer(
+async def delete_drawer(
     drawer_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    drawer = crud.get_drawer(db, drawer_id=drawer_id)
-    if drawer is None:
+    if not await crud.delete_drawer(db, drawer_id=drawer_id, owner_id=current_user.id):
         raise HTTPException(status_code=404, detail="Drawer not found")
-    if drawer.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to delete this drawer")
-    crud.delete_drawer(db, drawer_id=drawer_id)
     return {"message": "Drawer deleted successfully"}
 
 @app.put("/drawers/{drawer_id}", response_model=schemas.Drawer)
-def update_drawer(
+async def update_drawer(
     drawer_id: int,
     drawer_update: schemas.DrawerCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    existing_drawer = crud.get_drawer(db, drawer_id=drawer_id)
-    if existing_drawer is None:
+    updated_drawer = await crud.update_drawer(
+        db, drawer_id=drawer_id, drawer_update=drawer_update, owner_id=current_user.id
+    )
+    if updated_drawer is None:
         raise HTTPException(status_code=404, detail="Drawer not found")
-    if existing_drawer.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to modify this drawer")
-    updated_drawer = crud.update_drawer(db, drawer_id=drawer_id, drawer_update=drawer_update)
     return updated_drawer
 
 
 @app.post("/generate/bin/", response_model=BinGenerateResponse)
 async def generate_bin(
         request: BinGenerateRequest,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
-    service = BinGenerationService(
-        db=db,
-        base_output_dir=Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output")
-    )
     name = f"Bin_{request.width}_{request.depth}_{request.height}"
-    bin_record, files = await service.generate_bin(
+    bin_record, files = await get_bin_service().generate_bin(
+        db,
         name,
         width=request.width,
         depth=request.depth,
@@ -459,20 +486,17 @@ async def generate_bin(
         width=bin_record.width,
         depth=bin_record.depth,
         height=bin_record.height,
-        files=[GeneratedFileResponse(**file.__dict__) for file in files]
+        files=[GeneratedFileResponse.model_validate(file) for file in files]
     )
 
 @app.post("/generate/baseplate/", response_model=BinGenerateResponse)
 async def generate_baseplate_endpoint(
     request: BinGenerateRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    baseplate_service = BaseplateService(
-        db=db,
-        base_output_dir=Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output")
-    )
     name = f"Baseplate_{request.width}_{request.depth}_{request.height}"
-    baseplate, files = await baseplate_service.generate_baseplate(
+    baseplate, files = await get_baseplate_service().generate_baseplate(
+        db,
         name,
         drawer_id=request.drawer_id,
         width=request.width,
@@ -485,53 +509,33 @@ async def generate_baseplate_endpoint(
         width=baseplate.width,
         depth=baseplate.depth,
         height=5,
-        files=[GeneratedFileResponse(
-            id=file.id,
-            file_type=file.file_type,
-            file_path=file.file_path
-        ) for file in files]
+        files=[GeneratedFileResponse.model_validate(file) for file in files]
     )
 
 
-@app.get("/models/", response_model=List[schemas.ModelResponse])
+@app.get("/models/", response_model=None)
 async def get_models_endpoint(
     request: Request, 
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     # Explicitly declare optional query parameters to prevent them from being
     # passed to other dependencies
     local_kw: str = None,
 ):
-    model_service = ModelService(db)
-    models = model_service.retrieve_models()
-    
-    # Get base URL from request - use the actual host/port from the request
-    base_url = str(request.base_url).rstrip('/')
-    logger.info(f"Base URL for file paths: {base_url}")
-    
-    # Convert relative paths to full URLs
-    for model in models:
-        if model.file_path:
-            # Clean up any path that might be problematic
-            file_path = model.file_path
-            # Remove leading slash if present
-            if file_path.startswith('/'):
-                file_path = file_path[1:]
-            # Create the full URL
-            model.file_path = f"{base_url}/files/{file_path}"
-            logger.debug(f"Model file path: {model.file_path}")
-        else:
-            logger.warning(f"Model {model.id} ({model.name}) has no file path")
-    
-    logger.info(f"Returning {len(models)} models")
+    # Relative file paths become URLs under the configured base URL, or else
+    # under the request's own host/port
+    file_url_prefix = config.settings.FILES_PREFIX or str(request.base_url).rstrip('/') + "/files/"
+
+    models = await get_model_service().retrieve_models(db, file_url_prefix)
+
+    logger.debug("Returning %d models", len(models))
     return models
 
 @app.delete("/models/{model_id}")
 async def delete_model_endpoint(
     model_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    model_service = ModelService(db)
-    success = model_service.delete_model(model_id)
+    success = await get_model_service().delete_model(db, model_id)
     if not success:
         raise HTTPException(status_code=404, detail="Model not found")
     return {"message": "Model deleted successfully"}
@@ -539,37 +543,18 @@ async def delete_model_endpoint(
 @app.get("/models/view/{model_id}/stl")
 async def get_model_stl_file(
         model_id: int,
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ):
     """Get the STL file for a specific model."""
     try:
-        logger.info(f"Checking for model with ID: {model_id}")
-
-        # Try to find the bin with this ID
-        bin_model = db.query(models.Bin).filter(models.Bin.id == model_id).first()
-
-        if bin_model and bin_model.model_id:
-            logger.info(f"Found bin: ID={bin_model.id}, Name={bin_model.name}")
-            # Get the model associated with this bin
-            model = db.query(models.Model).filter(models.Model.id == bin_model.model_id).first()
-            if model:
-                return await get_stl_file_from_model(model, f"bin_{model_id}.stl")
-
-        # If not a bin, try baseplate
-        baseplate = db.query(models.Baseplate).filter(models.Baseplate.id == model_id).first()
-
-        if baseplate and baseplate.model_id:
-            logger.info(f"Found baseplate: ID={baseplate.id}, Name={baseplate.name}")
-            # Get the model associated with this baseplate
-            model = db.query(models.Model).filter(models.Model.id == baseplate.model_id).first()
-            if model:
-                return await get_stl_file_from_model(model, f"baseplate_{model_id}.stl")
-
-        # Also try directly looking for a model with this ID
-        model = db.query(models.Model).filter(models.Model.id == model_id).first()
-        if model:
-            logger.info(f"Found model directly: ID={model.id}, Type={model.type}")
-            return await get_stl_file_from_model(model, f"model_{model_id}.stl")
+        logger.debug("Checking for model with ID: %s", model_id)
+
+        # The ID may belong to a bin, a baseplate or a model, checked in that order
+        sources = {row.kind: row.model_id for row in await crud.find_model_sources(db, [model_id])}
+        for kind in ("bin", "baseplate", "model"):
+            if kind in sources:
+                logger.debug("Found %s with ID %s (model %s)", kind, model_id, sources[kind])
+                return await get_stl_file_from_model(db, sources[kind], f"{kind}_{model_id}.stl")
 
         # If we get here, we couldn't find a valid model
         logger.warning(f"No valid model found for ID {model_id}")
@@ -583,33 +568,30 @@ async def get_model_stl_file(
         raise HTTPException(status_code=500, detail=f"Error retrieving STL file: {str(e)}")
 
 
-async def get_stl_file_from_model(model, filename):
+async def get_stl_file_from_model(db: AsyncSession, model_id: int, filename):
     """Helper function to get STL file from a model"""
     try:
         # Find the STL file associated with this model
-        stl_file = next((f for f in model.files if f.file_type.upper() == "STL"), None)
+        stl_file = await crud.get_model_file(db, model_id, "STL")
 
         if stl_file:
-            logger.info(f"Found STL file: ID={stl_file.id}, Path={stl_file.file_path}")
-            base_output_dir = Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output")
-            file_path = base_output_dir / stl_file.file_path
-
-            logger.info(f"Full file path: {file_path}")
-            logger.info(f"File exists: {file_path.exists()}")
-
-            if file_path.exists():
-                logger.info(f"Returning STL file response for model {model.id}")
-                return FileResponse(
-                    path=file_path,
-                    filename=filename,
-                    media_type="model/stl"
+            logger.debug("Found STL file: ID=%s, Path=%s", stl_file.id, stl_file.file_path)
+            file_path = MODEL_OUTPUT_DIR / stl_file.file_path
+
+            logger.debug("Full file path: %s", file_path)
+
+            file_stat = model_file_stat(stl_file.file_path)
+            if file_stat is not None:
+                logger.debug("Returning STL file response for model %s", model_id)
+                return model_file_response(
+                    stl_file.file_path, filename=filename, media_type="model/stl", stat_result=file_stat
                 )
             else:
                 logger.warning(f"STL file not found on disk at {file_path}")
                 raise HTTPException(status_code=404, detail=f"STL file not found on disk at {file_path}")
         else:
-            logger.warning(f"No STL file found for model {model.id}")
-            raise HTTPException(status_code=404, detail=f"No STL file found for model {model.id}")
+            logger.warning(f"No STL file found for model {model_id}")
+            raise HTTPException(status_code=404, detail=f"No STL file found for model {model_id}")
 
     except HTTPException:
         raise
@@ -618,8 +600,21 @@ async def get_stl_file_from_model(model, filename):
         raise HTTPException(status_code=500, detail=f"Error retrieving STL file: {str(e)}")
 
 
+# Generated files belong to the shared Model record, not to individual bins or
+# baseplates; these loader options fetch them along with the record
+_MODEL_FILES = {
+    models.Bin: selectinload(models.Bin.model).selectinload(models.Model.files),
+    models.Baseplate: selectinload(models.Baseplate.model).selectinload(models.Model.files),
+}
+
+
+def _model_files(record):
+    """Files of the Model behind a bin or baseplate loaded with _MODEL_FILES"""
+    return record.model.files if record.model else []
+
+
 async def _ids_to_check(model_id):
-    logger.info(f"STL file requested for model ID: {model_id}")
+    logger.debug("STL file requested for model ID: %s", model_id)
     # List of IDs to check - try the requested ID, then ID-1, then ID+1
     # This handles the case where model IDs and directory names don't match
     ids_to_check = [model_id]
@@ -630,71 +625,54 @@ async def _ids_to_check(model_id):
     else:
         ids_to_check.append(model_id + 1)
         ids_to_check.append(model_id - 1)
-    logger.info(f"Will check these IDs in order: {ids_to_check}")
+    logger.debug("Will check these IDs in order: %s", ids_to_check)
     return ids_to_check
 
 
 @app.get("/models/view/{model_id}/cad")
 async def get_model_cad_file(
     model_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get the CAD file (FCStd) for a specific model."""
     try:
         ids_to_check = await _ids_to_check(model_id)
-        
-        # Try each ID in order
+
+        # Bins and baseplates for every candidate ID in one query, then their CAD files in another
+        sources = {
+            (row.record_id, row.kind): row.model_id
+            for row in await crud.find_model_sources(db, ids_to_check)
+        }
+        cad_files = await crud.get_model_files_by_type(db, list(set(sources.values())), "FCStd")
+
+        # Try each ID in order, a bin before a baseplate
         for check_id in ids_to_check:
-            logger.info(f"Checking for model with ID: {check_id}")
-            
-            # Attempt to find the bin first
-            bin_model = db.query(models.Bin).filter(models.Bin.id == check_id).first()
-            
-            if bin_model:
-                logger.info(f"Found bin model: ID={bin_model.id}, Name={bin_model.name}")
-                # Find the CAD file associated with this bin
-                cad_file = next((f for f in bin_model.files if f.file_type.upper() == "FCSTD"), None)
-                
-                if cad_file:
-                    logger.info(f"Found CAD file: ID={cad_file.id}, Path={cad_file.file_path}")
-                    file_path = Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output") / cad_file.file_path
-                    logger.info(f"Full file path: {file_path}")
-                    logger.info(f"File exists: {file_path.exists()}")
-                    
-                    if file_path.exists():
-                        logger.info(f"Returning CAD file response for bin {check_id} (originally requested ID: {model_id})")
-                        return FileResponse(
-                            path=file_path,
-                            filename=f"bin_{check_id}.FCStd",
-                            media_type="application/octet-stream"
-                        )
-                    else:
-                        logger.warning(f"CAD file not found on disk at {file_path}")
-                
-            # If not a bin, try baseplate
-            baseplate = db.query(models.Baseplate).filter(models.Baseplate.id == check_id).first()
-            
-            if baseplate:
-                logger.info(f"Found baseplate model: ID={baseplate.id}, Name={baseplate.name}")
-                # Find the CAD file associated with this baseplate
-                cad_file = next((f for f in baseplate.files if f.file_type.upper() == "FCSTD"), None)
-                
+            for kind in ("bin", "baseplate"):
+                source_model_id = sources.get((check_id, kind))
+                if source_model_id is None:
+                    continue
+                logger.debug("Found %s model: ID=%s", kind, check_id)
+
+                # Find the CAD file associated with this record
+                cad_file = cad_files.get(source_model_id)
+
                 if cad_file:
-                    logger.info(f"Found CAD file: ID={cad_file.id}, Path={cad_file.file_path}")
-                    file_path = Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output") / cad_file.file_path
-                    logger.info(f"Full file path: {file_path}")
-                    logger.info(f"File exists: {file_path.exists()}")
-                    
-                    if file_path.exists():
-                        logger.info(f"Returning CAD file response for baseplate {check_id} (originally requested ID: {model_id})")
-                        return FileResponse(
-                            path=file_path,
-                            filename=f"baseplate_{check_id}.FCStd",
-                            media_type="application/octet-stream"
+                    logger.debug("Found CAD file: ID=%s, Path=%s", cad_file.id, cad_file.file_path)
+                    file_path = MODEL_OUTPUT_DIR / cad_file.file_path
+                    logger.debug("Full file path: %s", file_path)
+
+                    file_stat = model_file_stat(cad_file.file_path)
+                    if file_stat is not None:
+                        logger.debug("Returning CAD file response for %s %s (originally requested ID: %s)", kind, check_id, model_id)
+                        return model_file_response(
+                            cad_file.file_path,
+                            filename=f"{kind}_{check_id}.FCStd",
+                            media_type="application/octet-stream",
+                            stat_result=file_stat
                         )
                     else:
                         logger.warning(f"CAD file not found on disk at {file_path}")
-        
+
         # If we get here, we tried all the IDs and couldn't find a valid model
         logger.warning(f"No valid model found for ID {model_id} or adjacent IDs")
         raise HTTPException(status_code=404, detail=f"No valid model found for ID {model_id} or adjacent IDs")
@@ -708,8 +686,7 @@ async def get_model_cad_file(
 
 @app.get("/models/download/{model_id}")
 async def download_model_file(
-    model_id: int,
-    db: Session = Depends(get_db)
+    model_id: int
 ):
     """Get the downloadable CAD file for a specific model - redirect to CAD endpoint."""
     # Redirect to the CAD endpoint for backward compatibility
@@ -718,10 +695,10 @@ async def download_model_file(
 @app.get("/debug/model/{model_id}")
 async def debug_model(
     model_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Debug endpoint to check model details."""
-    logger.info(f"Debug request for model ID: {model_id}")
+    logger.debug("Debug request for model ID: %s", model_id)
     
     # Create a response object
     debug_info = {
@@ -732,7 +709,7 @@ async def debug_model(
     }
     
     # Check if model exists as a bin
-    bin_model = db.query(models.Bin).filter(models.Bin.id == model_id).first()
+    bin_model = await db.get(models.Bin, model_id, options=[_MODEL_FILES[models.Bin]])
     if bin_model:
         debug_info["bin"] = {
             "id": bin_model.id,
@@ -744,8 +721,8 @@ async def debug_model(
         }
         
         # Get files for this bin
-        for file in bin_model.files:
-            file_path = Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output") / file.file_path
+        for file in _model_files(bin_model):
+            file_path = MODEL_OUTPUT_DIR / file.file_path
             debug_info["bin"]["files"].append({
                 "id": file.id,
                 "file_type": file.file_type,
@@ -756,7 +733,7 @@ async def debug_model(
             debug_info["file_paths"].append(str(file_path))
     
     # Check if model exists as a baseplate
-    baseplate = db.query(models.Baseplate).filter(models.Baseplate.id == model_id).first()
+    baseplate = await db.get(models.Baseplate, model_id, options=[_MODEL_FILES[models.Baseplate]])
     if baseplate:
         debug_info["baseplate"] = {
             "id": baseplate.id,
@@ -767,8 +744,8 @@ async def debug_model(
         }
         
         # Get files for this baseplate
-        for file in baseplate.files:
-            file_path = Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output") / file.file_path
+        for file in _model_files(baseplate):
+            file_path = MODEL_OUTPUT_DIR / file.file_path
             debug_info["baseplate"]["files"].append({
                 "id": file.id,
                 "file_type": file.file_type,
@@ -786,38 +763,30 @@ async def debug_model(
     
     return debug_info
 
-@app.post("/drawers/grid-layout/", response_model=DrawerGridResponse)
+# The response is built as plain dicts and serialized by orjson directly; the
+# model is only declared for the OpenAPI schema, so units are not validated twice
+@app.post("/drawers/grid-layout/", response_model=None, responses={200: {"model": DrawerGridResponse}})
 async def calculate_drawer_grid(
     request: DrawerGridRequest
 ):
     try:
-        # Create a GridfinityBaseplate instance
-        config = GridfinityConfig()
-        baseplate = GridfinityBaseplate(
-            drawer_width=request.width,
-            drawer_depth=request.depth,
-            config=config
-        )
-        
-        # Calculate grid units
-        units = baseplate.grid_divider()
-        
-        # Convert to response model
-        unit_responses = [
-            UnitResponse(
-                width=unit.width,
-                depth=unit.depth,
-                x_offset=unit.x_offset,
-                y_offset=unit.y_offset,
-                is_standard=unit.is_standard
-            ) for unit in units
-        ]
+        # Grid division is CPU-bound; repeated sizes come from cache, the rest
+        # run in the CAD process pool
+        units, grid_size_x, grid_size_y = await cad_worker.get_grid(request.width, request.depth)
         
-        return DrawerGridResponse(
-            units=unit_responses,
-            gridSizeX=baseplate.num_squares_x,
-            gridSizeY=baseplate.num_squares_y
-        )
+        return ORJSONResponse(content={
+            "units": [
+                {
+                    "width": width,
+                    "depth": depth,
+                    "x_offset": x_offset,
+                    "y_offset": y_offset,
+                    "is_standard": is_standard
+                } for width, depth, x_offset, y_offset, is_standard in units
+            ],
+            "gridSizeX": grid_size_x,
+            "gridSizeY": grid_size_y
+        })
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -826,37 +795,48 @@ async def calculate_drawer_grid(
         
 @app.post("/drawers/generate-models/", response_model=GenerateDrawerModelsResponse)
 async def generate_drawer_models(
-    request: dict,
-    db: Session = Depends(get_db),
+    request: GenerateDrawerModelsRequest,
+    background_tasks: BackgroundTasks,
+    background: bool = False,
+    db: AsyncSession = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """
-    Modified to receive raw dict instead of validated model to debug validation issues
+    Generate the baseplate and bin models for a drawer.
+
+    With ?background=true the drawer is saved and the response returns at once;
+    the models are generated afterwards and the drawer id is returned as jobId.
     """
-    logger.info(f"Generate drawer models request received: {request}")
-    
-    # Manually validate the request
-    validated_request = await _validate_generate_request(request)
-    
+    logger.info(f"Generate drawer models request for drawer: {request.name} - "
+                f"dimensions: {request.width}x{request.depth}x{request.height} - "
+                f"bins count: {len(request.bins)}")
+
     try:
-        if validated_request.drawer_id:
-            drawer = await _retrieve_drawer(current_user, db, validated_request)
+        if request.drawer_id:
+            drawer = await _retrieve_drawer(current_user, db, request)
         else:
-            drawer = await _create_drawer(current_user, db, validated_request)
-
-        model_ids = []
-
-        await _create_baseplate(db, model_ids, drawer, validated_request)
+            drawer = await _create_drawer(current_user, db, request)
+
+        if background:
+            drawer.generation_status = "pending"
+            await db.commit()
+            background_tasks.add_task(_generate_drawer_models_job, drawer.id, request)
+            logger.info(f"Queued model generation for drawer {drawer.id}")
+            return GenerateDrawerModelsResponse(
+                message=f"Drawer {request.name} model generation started",
+                modelIds=[],
+                jobId=drawer.id
+            )
 
-        await _generate_bins(db, model_ids, drawer, validated_request)
+        model_ids = await _generate_drawer_contents(db, drawer, request)
 
         # Commit all changes
         logger.debug("Committing all changes to database")
-        db.commit()
+        await db.commit()
         
-        logger.info(f"Successfully generated {len(model_ids)} models for drawer {validated_request.name}")
+        logger.info(f"Successfully generated {len(model_ids)} models for drawer {request.name}")
         return GenerateDrawerModelsResponse(
-            message=f"Drawer {validated_request.name} models generated successfully",
+            message=f"Drawer {request.name} models generated successfully",
             modelIds=model_ids
         )
         
@@ -866,18 +846,54 @@ async def generate_drawer_models(
     except Exception as e:
         # Catch any other exceptions and log them
         logger.exception(f"Unexpected error generating drawer models: {str(e)}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Unexpected error generating drawer models: {str(e)}"
         )
 
 
-async def _retrieve_drawer(current_user: models.User, db: Session, validated_request: GenerateDrawerModelsRequest):
-    drawer = db.query(models.Drawer).filter(
-        models.Drawer.id == validated_request.drawer_id,
-        models.Drawer.owner_id == current_user.id
-    ).first()
+async def _generate_drawer_models_job(drawer_id: int, validated_request: GenerateDrawerModelsRequest):
+    """Background part of generate_drawer_models; runs after the response on its own session"""
+    async with SessionLocal() as db:
+        drawer = await db.get(models.Drawer, drawer_id)
+        if drawer is None:
+            logger.warning(f"Drawer {drawer_id} was removed before its models were generated")
+            return
+
+        try:
+            model_ids = await _generate_drawer_contents(db, drawer, validated_request)
+            drawer.generation_status = "ready"
+            await db.commit()
+            logger.info(f"Successfully generated {len(model_ids)} models for drawer {drawer_id} in the background")
+        except Exception as e:
+            logger.exception(f"Background model generation failed for drawer {drawer_id}: {str(e)}")
+            await db.rollback()
+            await db.execute(
+                update(models.Drawer).where(models.Drawer.id == drawer_id).values(generation_status="failed")
+            )
+            await db.commit()
+
+
+@app.get("/drawers/{drawer_id}/generation-status")
+async def get_drawer_generation_status(
+    drawer_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    drawer = await crud.get_drawer(db, drawer_id=drawer_id, owner_id=current_user.id)
+    if drawer is None:
+        raise HTTPException(status_code=404, detail="Drawer not found")
+    return {"drawer_id": drawer.id, "status": drawer.generation_status}
+
+
+async def _retrieve_drawer(current_user: models.User, db: AsyncSession, validated_request: GenerateDrawerModelsRequest):
+    drawer = await db.scalar(
+        select(models.Drawer).where(
+            models.Drawer.id == validated_request.drawer_id,
+            models.Drawer.owner_id == current_user.id
+        ).limit(1)
+    )
     if not drawer:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -891,12 +907,12 @@ async def _retrieve_drawer(current_user: models.User, db: Session, validated_req
     return drawer
 
 
-async def _generate_bins(db: Session, model_ids, drawer: Drawer, validated_request: GenerateDrawerModelsRequest):
-    # Then generate bins
-    bin_service = BinGenerationService(
-        db=db,
-        base_output_dir=Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output")
-    )
+async def _generate_drawer_contents(db: AsyncSession, drawer: Drawer, validated_request: GenerateDrawerModelsRequest) -> List[str]:
+    """
+    Create the baseplate and bins for a drawer, generating any missing models.
+    Model lookups share the session and run in order; the CAD rendering of the
+    new baseplate and bin models then runs concurrently. Returns the baseplate file IDs.
+    """
     # Group bins by their dimensions to optimize model reuse
     dimension_groups = {}
     for bin_request in validated_request.bins:
@@ -904,95 +920,96 @@ async def _generate_bins(db: Session, model_ids, drawer: Drawer, validated_reque
         if key not in dimension_groups:
             dimension_groups[key] = []
         dimension_groups[key].append(bin_request)
-    
-    # Generate bins group by group to improve model reuse
+
+    bin_service = get_bin_service()
+    baseplate_service = get_baseplate_service()
+    logger.debug(f"Generating baseplate and {len(dimension_groups)} bin models for drawer {validated_request.name}")
+    try:
+        baseplate_model, baseplate_is_new = await baseplate_service.find_or_add_baseplate_model(
+            db, width=validated_request.width, depth=validated_request.depth
+        )
+        models_by_dimensions, new_bin_models = await bin_service.find_or_add_bin_models(db, list(dimension_groups))
+
+        renders = [bin_service.generate_files_for_models(db, new_bin_models)]
+        if baseplate_is_new:
+            renders.append(baseplate_service.generate_model_files(db, baseplate_model))
+        # Let every render finish before raising, so none adds records after the rollback
+        results = await asyncio.gather(*renders, return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+    except Exception as e:
+        logger.exception(f"Failed to generate drawer models: {str(e)}")
+        # Roll back the transaction and re-raise
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to generate drawer models: {str(e)}"
+        )
+
+    model_ids = await _create_baseplate(db, drawer, validated_request, baseplate_model)
+    await _create_bins(db, drawer, dimension_groups, models_by_dimensions)
+    return model_ids
+
+
+async def _create_bins(db: AsyncSession, drawer: Drawer, dimension_groups, models_by_dimensions):
+    # Collect the bin rows and write them in one batched INSERT
+    bin_rows = []
     for i, (dimensions, bins_in_group) in enumerate(dimension_groups.items()):
         width, depth, height = dimensions
+        model = models_by_dimensions[dimensions]
 
         logger.debug(f"Processing bin group {i + 1}/{len(dimension_groups)}: "
                      f"dimensions: {width}x{depth}x{height}, count: {len(bins_in_group)}")
 
-        try:
-            # Get or create the model - without creating a bin record
-            result = await bin_service.get_or_create_bin_model(
-                width=width,
-                depth=depth,
-                height=height,
-                drawer_id=drawer.id
-            )
-
-            model = result
-
-            # Process all bins in this dimension group
-            for j, bin_request in enumerate(bins_in_group):
-                bin_name = f"Bin_{bin_request.id.split('-')[0]}"
-                
-                if j == 0:
-                    logger.debug(f"Adding first bin in group: {bin_name}")
-                else:
-                    logger.debug(f"Adding bin {j + 1}/{len(bins_in_group)}: {bin_name} (reusing model)")
-
-                # Create bin record linked to the drawer and the model
-                new_bin = models.Bin(
-                    name=bin_name,
-                    width=width,
-                    depth=depth,
-                    height=height,
-                    x_position=bin_request.x,
-                    y_position=bin_request.y,
-                    drawer_id=drawer.id ,
-                    model_id=model.id  # Use the same model for all bins in this group
-                )
-                db.add(new_bin)
-                
-                # No need to create file records for individual bins anymore
-                # Files are associated with the model and can be accessed via bin.model.files
+        # Process all bins in this dimension group
+        for j, bin_request in enumerate(bins_in_group):
+            bin_name = f"Bin_{bin_request.id.split('-')[0]}"
 
-            # Flush after each group to ensure changes are saved
-            db.flush()
+            if j == 0:
+                logger.debug(f"Adding first bin in group: {bin_name}")
+            else:
+                logger.debug(f"Adding bin {j + 1}/{len(bins_in_group)}: {bin_name} (reusing model)")
+
+            # Bin row linked to the drawer and the model
+            bin_rows.append({
+                "name": bin_name,
+                "width": width,
+                "depth": depth,
+                "height": height,
+                "x_position": bin_request.x,
+                "y_position": bin_request.y,
+                "drawer_id": drawer.id,
+                "model_id": model.id  # Use the same model for all bins in this group
+            })
 
+            # No need to create file records for individual bins anymore
+            # Files are associated with the model and can be accessed via bin.model.files
 
-        except Exception as e:
-            logger.exception(f"Failed to generate bin group {dimensions}: {str(e)}")
-            # Roll back the transaction and re-raise
-            db.rollback()
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to generate bin group {dimensions}: {str(e)}"
-            )
+    if bin_rows:
+        await db.execute(insert(models.Bin), bin_rows)
 
 
-async def _create_baseplate(db: Session, model_ids , drawer: Drawer, validated_request: GenerateDrawerModelsRequest):
-    # First generate baseplate
-    config = GridfinityConfig()
-    baseplate_service = BaseplateService(
-        db=db,
-        base_output_dir=Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output")
+async def _create_baseplate(db: AsyncSession, drawer: Drawer, validated_request: GenerateDrawerModelsRequest, model: models.Model) -> List[str]:
+    # Baseplate record linked to the drawer and its model
+    baseplate = models.Baseplate(
+        name=f"Baseplate_{validated_request.name}",
+        width=validated_request.width,
+        depth=validated_request.depth,
+        drawer_id=drawer.id,
+        model_id=model.id
     )
-    logger.debug(f"Generating baseplate for drawer {validated_request.name}")
-    baseplate_name = f"Baseplate_{validated_request.name}"
-    try:
-        baseplate, baseplate_files = await baseplate_service.generate_baseplate(
-            baseplate_name,
-            drawer.id,
-            width=validated_request.width,
-            depth=validated_request.depth
-        )
+    db.add(baseplate)
+    await db.flush()
+    logger.debug(f"Created baseplate {baseplate.id} linked to model {model.id}")
 
-        for file in baseplate_files:
-            model_ids.append(str(file.id))
-            logger.debug(f"Added baseplate file ID: {file.id}, path: {file.file_path}")
-    except Exception as e:
-        logger.exception(f"Failed to generate baseplate: {str(e)}")
-        # Roll back the transaction and re-raise
-        db.rollback()
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to generate baseplate: {str(e)}"
-        )
+    file_ids = (await db.scalars(
+        select(models.GeneratedFile.id).where(models.GeneratedFile.model_id == model.id)
+    )).all()
+    return [str(file_id) for file_id in file_ids]
 
 
-async def _create_drawer(current_user: models.User , db: Session, validated_request: GenerateDrawerModelsRequest):
+async def _create_drawer(current_user: models.User , db: AsyncSession, validated_request: GenerateDrawerModelsRequest):
     # Create drawer record
     new_drawer = models.Drawer(
         name=validated_request.name,
@@ -1002,148 +1019,79 @@ async def _create_drawer(current_user: models.User , db: Session, validated_requ
         owner_id=current_user.id
     )
     db.add(new_drawer)
-    db.flush()  # Get the drawer ID
+    await db.flush()  # Get the drawer ID
     logger.debug(f"Created drawer record with ID: {new_drawer.id}")
     return new_drawer
 
 
-async def _validate_generate_request(request):
-    try:
-        # Check for required fields
-        if not isinstance(request, dict):
-            raise ValueError("Request must be a JSON object")
-
-        required_fields = ["name", "width", "depth", "height", "bins"]
-        for field in required_fields:
-            if field not in request:
-                raise ValueError(f"Missing required field: {field}")
-
-        # Validate bins array
-        if not isinstance(request["bins"], list):
-            raise ValueError("'bins' must be an array")
-
-        for i, bin_item in enumerate(request["bins"]):
-            if not isinstance(bin_item, dict):
-                raise ValueError(f"Bin at index {i} must be an object")
-
-            bin_fields = ["id", "width", "depth", "x", "y", "unitX", "unitY", "unitWidth", "unitDepth"]
-            for field in bin_fields:
-                if field not in bin_item:
-                    raise ValueError(f"Bin at index {i} is missing required field: {field}")
-
-        # Convert to validated model
-        validated_request = GenerateDrawerModelsRequest(
-            name=request["name"],
-            width=float(request["width"]),
-            depth=float(request["depth"]),
-            height=float(request["height"]),
-            drawer_id = int(request["drawer_id"]),
-            bins=[
-                PlacedBinRequest(
-                    id=bin_item["id"],
-                    width=float(bin_item["width"]),
-                    depth=float(bin_item["depth"]),
-                    x=float(bin_item["x"]),
-                    y=float(bin_item["y"]),
-                    unitX=int(bin_item["unitX"]),
-                    unitY=int(bin_item["unitY"]),
-                    unitWidth=int(bin_item["unitWidth"]),
-                    unitDepth=int(bin_item["unitDepth"])
-                ) for bin_item in request["bins"]
-            ]
-        )
-
-        logger.info(f"Validated request for drawer: {validated_request.name} - "
-                    f"dimensions: {validated_request.width}x{validated_request.depth}x{validated_request.height} - "
-                    f"bins count: {len(validated_request.bins)}")
-    except Exception as e:
-        logger.error(f"Validation error in generate_drawer_models: {str(e)}")
-        logger.error(f"Request data: {request}")
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=f"Invalid request data: {str(e)}"
-        )
-    return validated_request
-
-
 @app.get("/users/settings/", response_model=schemas.UserSettings)
 async def get_user_settings(
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     local_kw: str = None,
 ):
     """Get current user settings"""
     logger.info(f"Getting settings for user {current_user.username}")
-    settings = crud.get_user_settings(db, current_user.id)
+    settings = await crud.get_user_settings(db, current_user.id)
     if not settings:
         # Create default settings if none exist
         logger.info(f"Creating default settings for user {current_user.username}")
-        settings = crud.create_user_settings(db, current_user.id, schemas.UserSettingsCreate())
+        settings = await crud.create_user_settings(db, current_user.id, schemas.UserSettingsCreate())
     return settings
 
 @app.put("/users/settings/", response_model=schemas.UserSettings)
 async def update_user_settings(
     settings_update: schemas.UserSettingsUpdate,
     current_user: models.User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user settings"""
     logger.info(f"Updating settings for user {current_user.username}: {settings_update}")
-    updated_settings = crud.update_user_settings(db, current_user.id, settings_update)
+    updated_settings = await crud.update_user_settings(db, current_user.id, settings_update)
     return updated_settings
 
 
 @app.get("/drawers/{drawer_id}/baseplates")
-def get_drawer_baseplates(
+async def get_drawer_baseplates(
         drawer_id: int,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: models.User = Depends(get_current_user)
 ):
-    drawer = crud.get_drawer(db, drawer_id=drawer_id)
+    drawer = await crud.get_drawer(db, drawer_id=drawer_id, owner_id=current_user.id)
     if drawer is None:
         raise HTTPException(status_code=404, detail="Drawer not found")
-    if drawer.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not authorized to access this drawer")
 
     # Get baseplates for this drawer
-    baseplates = db.query(models.Baseplate).filter(models.Baseplate.drawer_id == drawer_id).all()
+    baseplates = (await db.scalars(select(models.Baseplate).where(models.Baseplate.drawer_id == drawer_id))).all()
     return baseplates
 
 
 @app.get("/models/view/{model_id}/baseplate/stl")
-async def get_baseplate_stl_file(model_id: int, db: Session = Depends(get_db)):
+async def get_baseplate_stl_file(model_id: int, db: AsyncSession = Depends(get_db)):
     """Get the STL file for a specific baseplate model."""
     try:
-        # Find the baseplate
-        baseplate = db.query(models.Baseplate).filter(models.Baseplate.id == model_id).first()
+        # Find the baseplate and the STL file of its model in one query
+        baseplate_file = await crud.get_baseplate_file(db, model_id, "STL")
 
-        if not baseplate:
+        if not baseplate_file:
             raise HTTPException(status_code=404, detail="Baseplate not found")
 
-        if not baseplate.model_id:
+        if not baseplate_file.model_id:
             raise HTTPException(status_code=404, detail="Baseplate has no associated model")
 
-        # Get the model associated with this baseplate
-        model = db.query(models.Model).filter(models.Model.id == baseplate.model_id).first()
-
-        if not model:
-            raise HTTPException(status_code=404, detail="Associated model not found")
-
-        # Find the STL file associated with this model
-        stl_file = next((f for f in model.files if f.file_type.upper() == "STL"), None)
-
-        if not stl_file:
+        if not baseplate_file.file_path:
             raise HTTPException(status_code=404, detail="STL file not found for this baseplate model")
 
-        file_path = Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output") / stl_file.file_path
+        file_stat = model_file_stat(baseplate_file.file_path)
 
-        if not file_path.exists():
+        if file_stat is None:
             raise HTTPException(status_code=404, detail="STL file not found on disk")
 
-        return FileResponse(
-            path=file_path,
+        return model_file_response(
+            baseplate_file.file_path,
             filename=f"baseplate_{model_id}.stl",
-            media_type="model/stl"
+            media_type="model/stl",
+            stat_result=file_stat
         )
 
     except HTTPException:
@@ -1154,39 +1102,31 @@ async def get_baseplate_stl_file(model_id: int, db: Session = Depends(get_db)):
 
 
 @app.get("/models/view/{model_id}/baseplate/cad")
-async def get_baseplate_cad_file(model_id: int, db: Session = Depends(get_db)):
+async def get_baseplate_cad_file(model_id: int, db: AsyncSession = Depends(get_db)):
     """Get the CAD file for a specific baseplate model."""
     try:
-        # Find the baseplate
-        baseplate = db.query(models.Baseplate).filter(models.Baseplate.id == model_id).first()
+        # Find the baseplate and the CAD file of its model in one query
+        baseplate_file = await crud.get_baseplate_file(db, model_id, "FCStd")
 
-        if not baseplate:
+        if not baseplate_file:
             raise HTTPException(status_code=404, detail="Baseplate not found")
 
-        if not baseplate.model_id:
+        if not baseplate_file.model_id:
             raise HTTPException(status_code=404, detail="Baseplate has no associated model")
 
-        # Get the model associated with this baseplate
-        model = db.query(models.Model).filter(models.Model.id == baseplate.model_id).first()
-
-        if not model:
-            raise HTTPException(status_code=404, detail="Associated model not found")
-
-        # Find the CAD file associated with this model
-        cad_file = next((f for f in model.files if f.file_type.upper() == "FCSTD"), None)
-
-        if not cad_file:
+        if not baseplate_file.file_path:
             raise HTTPException(status_code=404, detail="CAD file not found for this baseplate model")
 
-        file_path = Path("/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output") / cad_file.file_path
+        file_stat = model_file_stat(baseplate_file.file_path)
 
-        if not file_path.exists():
+        if file_stat is None:
             raise HTTPException(status_code=404, detail="CAD file not found on disk")
 
-        return FileResponse(
-            path=file_path,
+        return model_file_response(
+            baseplate_file.file_path,
             filename=f"baseplate_{model_id}.FCStd",
-            media_type="application/octet-stream"
+            media_type="application/octet-stream",
+            stat_result=file_stat
         )
 
     except HTTPException:
@@ -0,0 +1,86 @@
+# backend/app/middleware.py
+"""
+Custom middleware, written against the plain ASGI interface. Starlette's
+BaseHTTPMiddleware runs each request in its own task group and wraps the
+response stream, so it is not used here.
+"""
+import logging
+
+from fastapi.middleware.gzip import GZipMiddleware
+
+logger = logging.getLogger(__name__)
+
+# Routes that serve generated model files rather than API data
+FILE_ROUTE_PREFIXES = ("/files/", "/models/view/", "/models/download/")
+
+
+class QueryFilterMiddleware:
+    """Middleware to filter out problematic query parameters."""
+
+    # Raw query-string prefixes of the parameters to drop
+    FILTERED_PARAMS = (b"local_kw=",)
+    # File and model download routes don't need filtering, so they skip it entirely
+    BYPASS_PREFIXES = FILE_ROUTE_PREFIXES
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.BYPASS_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        query_string = scope.get("query_string", b"")
+        # Fast path: a single substring scan when nothing needs filtering
+        if b"local_kw" in query_string:
+            # Filter the raw bytes so kept parameters pass through exactly as sent
+            parts = [
+                part for part in query_string.split(b"&")
+                if not (part + b"=").startswith(self.FILTERED_PARAMS)
+            ]
+            filtered = b"&".join(parts)
+            if filtered != query_string:
+                logger.info(f"Filtering out query parameters from: {query_string.decode('latin-1')}")
+                # ASGI lets middleware modify the scope it passes on, so no copy is needed
+                scope["query_string"] = filtered
+
+        await self.app(scope, receive, send)
+
+
+class CacheControlMiddleware:
+    """Adds a Cache-Control header to successful responses under a path prefix."""
+
+    def __init__(self, app, path_prefix: str, cache_control: str = "public, max-age=3600"):
+        self.app = app
+        self.path_prefix = path_prefix
+        self.header = (b"cache-control", cache_control.encode("latin-1"))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cache_control(message):
+            if message["type"] == "http.response.start" and message["status"] in (200, 304):
+                headers = message.get("headers", [])
+                # Leave any Cache-Control set by the endpoint itself alone
+                if not any(name.lower() == b"cache-control" for name, value in headers):
+                    message = dict(message, headers=[*headers, self.header])
+            await send(message)
+
+        await self.app(scope, receive, send_with_cache_control)
+
+
+class SelectiveGZipMiddleware:
+    """GZipMiddleware for every path except the excluded prefixes."""
+
+    def __init__(self, app, exclude_prefixes=(), **gzip_options):
+        self.app = app
+        self.gzip_app = GZipMiddleware(app, **gzip_options)
+        self.exclude_prefixes = tuple(exclude_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith(self.exclude_prefixes):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip_app(scope, receive, send)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Index, JSON, func
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .db.base import Base
@@ -41,6 +41,18 @@ class Model(Base):
     bins = relationship("Bin", back_populates="model")
     baseplates = relationship("Baseplate", back_populates="model")
 
+    __table_args__ = (
+        # Backs crud.get_model_by_metadata, which filters on type plus each
+        # dimension read from model_metadata as a float
+        Index(
+            "ix_models_type_dims",
+            type,
+            model_metadata["width"].as_float(),
+            model_metadata["depth"].as_float(),
+            model_metadata["height"].as_float()
+        ),
+    )
+
 
 class Drawer(Base):
     __tablename__ = "drawers"
@@ -51,7 +63,9 @@ class Drawer(Base):
     depth = Column(Float)
     height = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    owner_id = Column(Integer, ForeignKey("users.id"), index=True)
+    # Latest background model generation: pending, ready or failed
+    generation_status = Column(String, nullable=True)
     owner = relationship("User", back_populates="drawers")
     bins = relationship("Bin", back_populates="drawer")
     baseplates = relationship("Baseplate", back_populates="drawer")
@@ -66,10 +80,10 @@ class Bin(Base):
     depth = Column(Float)
     height = Column(Float)
     is_standard = Column(Boolean, default=True)
-    drawer_id = Column(Integer, ForeignKey("drawers.id"))
+    drawer_id = Column(Integer, ForeignKey("drawers.id"), index=True)
     drawer = relationship("Drawer", back_populates="bins")
     created_at = Column(DateTime, default=datetime.utcnow)
-    model_id = Column(Integer, ForeignKey("models.id"), nullable=True)
+    model_id = Column(Integer, ForeignKey("models.id"), nullable=True, index=True)
     model = relationship("Model", back_populates="bins")
     # Position within drawer
     x_position = Column(Float, nullable=True)
@@ -88,6 +102,12 @@ class GeneratedFile(Base):
     # Only keep the model relationship
     model = relationship("Model", back_populates="files")
 
+    __table_args__ = (
+        # Backs the file-by-type lookups in crud, which match upper(file_type)
+        # because stored types differ in case
+        Index("ix_generated_files_model_id_file_type", model_id, func.upper(file_type)),
+    )
+
 
 class Baseplate(Base):
     __tablename__ = "baseplates"
@@ -97,7 +117,7 @@ class Baseplate(Base):
     width = Column(Float)
     depth = Column(Float)
     created_at = Column(DateTime, default=datetime.utcnow)
-    model_id = Column(Integer, ForeignKey("models.id"), nullable=True)
-    drawer_id = Column(Integer, ForeignKey("drawers.id"), nullable=True)
+    model_id = Column(Integer, ForeignKey("models.id"), nullable=True, index=True)
+    drawer_id = Column(Integer, ForeignKey("drawers.id"), nullable=True, index=True)
     model = relationship("Model", back_populates="baseplates")
     drawer = relationship("Drawer", back_populates="baseplates")
\ No newline at end of file
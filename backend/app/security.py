@@ -1,14 +1,19 @@
 from datetime import datetime, timedelta, UTC
+from functools import lru_cache
+import logging
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from app.utils.password import verify_password
-from . import crud, models, schemas
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.utils.password import get_password_hash, verify_password
+from . import cache, crud, models, schemas
 from .database import get_db
 
+logger = logging.getLogger(__name__)
+
 # Security constants
 SECRET_KEY = "your-secret-key-keep-it-secret"  # Change this in production!
 ALGORITHM = "HS256"
@@ -21,15 +26,32 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[models.User]:
-    user = crud.get_user_by_username(db, username)
-    if not user:
-        return None
-    if not verify_password(password, user.hashed_password):
+async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[models.User]:
+    # Credentials that verified in the last few seconds skip the (deliberately slow) hash check
+    cached_login = cache.get_cached_login(username, password)
+    if cached_login is not None:
+        user_id, hashed_password = cached_login
+        user = await crud.get_user(db, user_id)
+        # A changed password (possibly on another worker) changes the hash
+        if user and user.username == username and user.hashed_password == hashed_password:
+            return user
+
+    user = await crud.get_user_by_username(db, username)
+    # bcrypt takes ~100ms of CPU, so it runs in the threadpool rather than on
+    # the event loop. Unknown usernames are checked against a dummy hash so
+    # they take as long as a wrong password
+    hashed_password = user.hashed_password if user else await run_in_threadpool(_dummy_hash)
+    if not await run_in_threadpool(verify_password, password, hashed_password) or not user:
         return None
+    cache.cache_login(username, password, user.id, user.hashed_password)
     return user
 
 
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return get_password_hash("dummy-password-for-unknown-users")
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -43,7 +65,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 async def get_current_user(
         token: str = Depends(oauth2_scheme),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_db)
 ) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -51,28 +73,32 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        # Log token for debugging (remove in production)
-        print(f"Token received: {token[:10]}...")
-        
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
-            print("Token payload missing username")
+            logger.debug("Token payload missing username")
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
         
-        print(f"Looking up user: {username}")
-        user = crud.get_user_by_username(db, username=token_data.username)
+        # A cached user skips the users table until the token expires
+        user = await cache.get_cached_user(token)
+        if user is not None:
+            return user
+
+        logger.debug("Looking up user: %s", username)
+        user = await crud.get_user_by_username(db, username=token_data.username)
         
         if user is None:
-            print(f"User not found: {username}")
+            logger.debug("User not found: %s", username)
             raise credentials_exception
+
+        await cache.cache_user(token, user, payload["exp"])
             
-        print(f"User authenticated: {username}")
+        logger.debug("User authenticated: %s", username)
         return user
     except JWTError as e:
-        print(f"JWT Error: {e}")
+        logger.debug("JWT Error: %s", e)
         raise credentials_exception
     except Exception as e:
-        print(f"Unexpected error in get_current_user: {e}")
+        logger.debug("Unexpected error in get_current_user: %s", e)
         raise credentials_exception
\ No newline at end of file
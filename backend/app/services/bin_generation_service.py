@@ -1,28 +1,38 @@
 from fastapi import HTTPException
 from pathlib import Path
+import asyncio
+import os
 import shutil
 import logging
 from typing import Tuple, Optional, List, Dict, Any, Coroutine
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Bin, GeneratedFile, Model
 from app import crud
-from core.gridfinity_custom_bin import GridfinityCustomBin
+from app.services import cad_worker
 from utils.freecad_setup import setup_freecad
 from core.gridfinity_config import GridfinityConfig
 logger = logging.getLogger(__name__)
 
+# Upper bound on 3D generations running at once, shared by all requests
+GENERATION_CONCURRENCY = int(os.getenv("BIN_GENERATION_CONCURRENCY", "4"))
+_generation_slots = asyncio.Semaphore(GENERATION_CONCURRENCY)
+
 
 class BinGenerationService:
-    def __init__(self, db: Session, base_output_dir: Path):
-        self.db = db
+    """
+    Generates bin models. Holds no per-request state, so one instance is shared;
+    callers pass their database session to each method.
+    """
+    def __init__(self, base_output_dir: Path):
         self.config = GridfinityConfig.from_env()
         if base_output_dir:
             self.config.BASE_OUTPUT_DIR = Path(base_output_dir)
         self.config.BASE_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
         self.FreeCAD = setup_freecad()
 
-    async def generate_bin(self, name: str, width: float, depth: float, height: float, drawer_id: int) -> Tuple[
+    async def generate_bin(self, db: AsyncSession, name: str, width: float, depth: float, height: float, drawer_id: int) -> Tuple[
         Bin, List[GeneratedFile]]| None:
         """
         Generate a bin model, creating both the Model record and a Bin record in the database.
@@ -37,7 +47,7 @@ class BinGenerationService:
             }
             
             logger.info(f"Checking for existing model with metadata: {model_metadata}")
-            existing_model = crud.get_model_by_metadata(self.db, "bin", model_metadata)
+            existing_model = await crud.get_model_by_metadata(db, "bin", model_metadata)
             
             if existing_model:
                 logger.info(f"Found existing model with ID {existing_model.id} - will reuse")
@@ -52,21 +62,23 @@ class BinGenerationService:
                         model_id=existing_model.id,
                         drawer_id=drawer_id
                     )
-                    self.db.add(bin_record)
-                    self.db.flush()  # Get ID without committing
+                    db.add(bin_record)
+                    await db.flush()  # Get ID without committing
                     
                     logger.info(f"Created bin {bin_record.id} linked to model {existing_model.id}")
                     
                     # Get the generated files associated with the model
-                    model_files = self.db.query(GeneratedFile).filter(GeneratedFile.model_id == existing_model.id).all()
+                    model_files = (await db.scalars(
+                        select(GeneratedFile).where(GeneratedFile.model_id == existing_model.id)
+                    )).all()
                     logger.info(f"Found {len(model_files)} existing files for model {existing_model.id}")
                     
                     # No need to create duplicate file records - the bin can access files through its model
                     # We can return the model's files directly since they're already in the database
                     
                     # Now commit all the changes
-                    self.db.commit()
-                    self.db.refresh(bin_record)
+                    await db.commit()
+                    await db.refresh(bin_record)
                     
                     logger.info(f"Successfully reused model {existing_model.id} for bin {bin_record.id}")
                     return bin_record, model_files
@@ -75,7 +87,7 @@ class BinGenerationService:
                     # If anything fails during model reuse, log, roll back, and raise the exception
                     error_msg = f"Failed to reuse model {existing_model.id}: {str(e)}"
                     logger.error(error_msg, exc_info=True)
-                    self.db.rollback()
+                    await db.rollback()
                     # Don't fall through - propagate the error to create a 500 response
                     raise HTTPException(status_code=500, detail=error_msg)
             else:
@@ -88,8 +100,8 @@ class BinGenerationService:
                 type="bin",
                 model_metadata=model_metadata
             )
-            self.db.add(new_model)
-            self.db.flush()  # Get model ID
+            db.add(new_model)
+            await db.flush()  # Get model ID
             logger.info(f"Created new model with ID {new_model.id}")
             
             # Create bin record linked to the new model
@@ -101,34 +113,34 @@ class BinGenerationService:
                 model_id=new_model.id,
                 drawer_id=drawer_id
             )
-            self.db.add(bin_record)
-            self.db.flush()  # Get bin ID
+            db.add(bin_record)
+            await db.flush()  # Get bin ID
             logger.info(f"Created bin with ID {bin_record.id} linked to model {new_model.id}")
 
             # Generate model files
-            generated_files = await self._generate_model_files(new_model.id, width, depth, height)
+            generated_files = await self._generate_model_files(db, new_model.id, width, depth, height)
             
             # Commit all changes
-            self.db.commit()
+            await db.commit()
             logger.info("Committed all database changes")
             
             # Refresh records
             for file in generated_files:
-                self.db.refresh(file)
-            self.db.refresh(bin_record)
+                await db.refresh(file)
+            await db.refresh(bin_record)
             
             logger.info(f"Bin generation completed successfully for bin {bin_record.id}")
             return bin_record, generated_files
         
         except Exception as e:
             logger.error("Bin generation failed", exc_info=True)
-            self.db.rollback()
+            await db.rollback()
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to generate bin: {str(e)}"
             )
             
-    async def get_or_create_bin_model(self, width: float, depth: float, height: float, drawer_id: int) -> Model:
+    async def get_or_create_bin_model(self, db: AsyncSession, width: float, depth: float, height: float, drawer_id: int) -> Model:
         """
         Get or create a bin model without creating a Bin record.
         Use this method when you already have or will create the Bin record separately,
@@ -143,7 +155,7 @@ class BinGenerationService:
             }
             
             logger.info(f"Checking for existing model with metadata: {model_metadata}")
-            existing_model = crud.get_model_by_metadata(self.db, "bin", model_metadata)
+            existing_model = await crud.get_model_by_metadata(db, "bin", model_metadata)
             
             if existing_model:
                 if isinstance(existing_model, list):
@@ -163,12 +175,12 @@ class BinGenerationService:
                 type="bin",
                 model_metadata=model_metadata
             )
-            self.db.add(new_model)
-            self.db.flush()  # Get model ID
+            db.add(new_model)
+            await db.flush()  # Get model ID
             logger.info(f"Created new model with ID {new_model.id}")
             
             # Generate the model files
-            await self._generate_model_files(new_model.id, width, depth, height)
+            await self._generate_model_files(db, new_model.id, width, depth, height)
             
             # No need to commit as this will be handled by the caller
             logger.info(f"Model generation completed for model {new_model.id}")
@@ -180,26 +192,107 @@ class BinGenerationService:
             # Don't roll back - let the caller handle transaction management
             raise
             
-    async def _generate_model_files(self, model_id: int, width: float, depth: float, height: float) -> list[GeneratedFile] | None:
+    async def get_or_create_bin_models(
+            self, db: AsyncSession, dimensions: List[Tuple[float, float, float]]
+    ) -> Dict[Tuple[float, float, float], Model]:
+        """
+        Get or create bin models for several (width, depth, height) tuples at once.
+        Lookups and inserts run in order on the shared session; the 3D generation
+        for the new models runs concurrently. Commit is left to the caller.
+        """
+        models_by_dimensions, new_models = await self.find_or_add_bin_models(db, dimensions)
+        await self.generate_files_for_models(db, new_models)
+        return models_by_dimensions
+
+    async def find_or_add_bin_models(
+            self, db: AsyncSession, dimensions: List[Tuple[float, float, float]]
+    ) -> Tuple[Dict[Tuple[float, float, float], Model], List[Model]]:
+        """
+        Look up the bin model for each (width, depth, height) tuple, adding and
+        flushing the missing ones. Returns the models by dimensions and the new
+        models, which have no files until generate_files_for_models runs.
+        """
+        models_by_dimensions = {}
+        new_models = []
+        for dimensions_key in dimensions:
+            width, depth, height = dimensions_key
+            model_metadata = {
+                "width": width,
+                "depth": depth,
+                "height": height
+            }
+
+            existing_model = await crud.get_model_by_metadata(db, "bin", model_metadata)
+            if existing_model:
+                logger.info(f"Reusing model {existing_model.id} for {width}x{depth}x{height}")
+                models_by_dimensions[dimensions_key] = existing_model
+                continue
+
+            new_model = Model(
+                type="bin",
+                model_metadata=model_metadata
+            )
+            db.add(new_model)
+            models_by_dimensions[dimensions_key] = new_model
+            new_models.append(new_model)
+
+        if new_models:
+            await db.flush()  # Get model IDs
+        return models_by_dimensions, new_models
+
+    async def generate_files_for_models(self, db: AsyncSession, new_models: List[Model]) -> None:
+        """
+        Generate the files for new bin models concurrently and add their file records.
+        The session is only used once every render has finished.
+        """
+        if not new_models:
+            return
+        logger.info(f"Generating files for {len(new_models)} new bin models")
+
+        # Let every render finish before raising, so none adds records after a failure
+        rendered = await asyncio.gather(*(
+            self._render_model_files(
+                model.id,
+                model.model_metadata["width"],
+                model.model_metadata["depth"],
+                model.model_metadata["height"]
+            )
+            for model in new_models
+        ), return_exceptions=True)
+        for result in rendered:
+            if isinstance(result, BaseException):
+                raise result
+        for model, files in zip(new_models, rendered):
+            self._add_file_records(db, model.id, files)
+
+    async def _generate_model_files(self, db: AsyncSession, model_id: int, width: float, depth: float, height: float) -> list[GeneratedFile] | None:
         """
         Helper method to generate model files for a given model ID.
         This handles the actual 3D model generation and file storage.
         """
+        files = await self._render_model_files(model_id, width, depth, height)
+        return self._add_file_records(db, model_id, files)
+
+    async def _render_model_files(self, model_id: int, width: float, depth: float, height: float) -> List[Tuple[str, str]]:
+        """
+        Build the 3D model and copy it to permanent storage.
+        Returns (file_type, relative_path) pairs; touches no database state,
+        so several of these can run at once.
+        """
         # Setup directories
         temp_dir = Path(f"/tmp/bin_{model_id}")
         temp_dir.mkdir(exist_ok=True)
         logger.info(f"Created temporary directory: {temp_dir}")
 
-        # Initialize outside try block to ensure it's always defined
-        generated_files = []
-        
+        files = []
+
         try:
-            # Generate files
+            # Generate files; FreeCAD work is CPU-bound, so run it in the CAD process pool
             logger.info(f"Generating 3D model files for bin (width={width}, depth={depth}, height={height})")
-            bin_maker = GridfinityCustomBin()
-            doc, fcstd_path, stl_path = bin_maker.create_bin(
-                width, depth, height, str(temp_dir)
-            )
+            async with _generation_slots:
+                fcstd_path, stl_path = await cad_worker.run_in_worker(
+                    cad_worker.render_bin, width, depth, height, str(temp_dir)
+                )
             logger.info(f"3D model generation completed: FCStd={fcstd_path}, STL={stl_path}")
 
             # Create permanent storage location using model_id
@@ -208,7 +301,7 @@ class BinGenerationService:
             permanent_dir.mkdir(parents=True, exist_ok=True)
             logger.info(f"Created permanent directory: {permanent_dir}")
 
-            # Move files to permanent location and create records
+            # Move files to permanent location
             for temp_path, file_type in [(Path(fcstd_path), "FCStd"), (Path(stl_path), "STL")]:
                 if not temp_path.exists():
                     error_msg = f"Failed to generate {file_type} file at {temp_path}"
@@ -222,33 +315,32 @@ class BinGenerationService:
                 permanent_path = permanent_dir / temp_path.name
                 shutil.copy2(temp_path, permanent_path)
                 logger.info(f"Copied {file_type} file to permanent location: {permanent_path}")
+                files.append((file_type, relative_path))
 
-                #not sure why we are creating the files here
-                # Create file record associated with the model only
-                file_record = GeneratedFile(
-                    file_type=file_type,
-                    file_path=relative_path,  # Store relative path
-                    model_id=model_id
-                    # No bin_id - files should be associated with the model, not individual bins
-                )
-                self.db.add(file_record)
-                generated_files.append(file_record)
-                logger.info(f"Created file record for {file_type}")
-
-            # The files have been created, we'll return them at the end of the function
-            
         except Exception as e:
             logger.error(f"Error generating model files: {str(e)}", exc_info=True)
             # We don't rollback here - let the caller handle transaction management
             raise
-            
+
         finally:
             # Always clean up the temp directory
             if temp_dir.exists():
                 shutil.rmtree(temp_dir)
                 logger.info(f"Removed temporary directory {temp_dir}")
-        
-        # This return is outside the try-except-finally blocks
-        # If an exception occurs, this line will never be reached
-        # If no exception occurs, this will return the generated files
-        return generated_files
\ No newline at end of file
+
+        return files
+
+    def _add_file_records(self, db: AsyncSession, model_id: int, files: List[Tuple[str, str]]) -> List[GeneratedFile]:
+        """Add GeneratedFile records for rendered files, associated with the model only"""
+        generated_files = []
+        for file_type, relative_path in files:
+            file_record = GeneratedFile(
+                file_type=file_type,
+                file_path=relative_path,  # Store relative path
+                model_id=model_id
+                # No bin_id - files should be associated with the model, not individual bins
+            )
+            db.add(file_record)
+            generated_files.append(file_record)
+            logger.info(f"Created file record for {file_type}")
+        return generated_files
@@ -0,0 +1,154 @@
+"""
+CPU-bound CAD work run in a process pool so it does not block the event loop.
+Functions submitted here are module-level and take and return plain values,
+so they can be pickled to the worker processes.
+"""
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from core.gridfinity_config import GridfinityConfig
+from utils.freecad_setup import setup_freecad
+
+logger = logging.getLogger(__name__)
+
+# Every API worker process (WEB_CONCURRENCY) has its own pool, so by default
+# they split the cores between them
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+CAD_WORKERS = int(os.getenv("CAD_WORKERS", str(max(1, (os.cpu_count() or 1) // WEB_CONCURRENCY))))
+
+# Workers are started by a fork server rather than forked from the API
+# process, which is already running threads (log listeners, threadpool).
+# The fork server imports this module once, so workers start with it loaded
+_mp_context = multiprocessing.get_context("forkserver")
+_mp_context.set_forkserver_preload([__name__])
+
+_executor: Optional[ProcessPoolExecutor] = None
+# Worker processes send their log records here; see start_log_listener
+_log_queue: Optional[multiprocessing.Queue] = None
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+# Grid settings never change at runtime, so every grid computation shares one config
+GRID_CONFIG = GridfinityConfig()
+
+# (width, depth, x_offset, y_offset, is_standard)
+UnitTuple = Tuple[float, float, float, float, bool]
+GridResult = Tuple[Tuple[UnitTuple, ...], int, int]
+
+# Most recently used grid layouts, keyed by drawer size
+GRID_CACHE_SIZE = int(os.getenv("GRID_CACHE_SIZE", "1024"))
+_grid_cache: "OrderedDict[Tuple[float, float], GridResult]" = OrderedDict()
+
+
+def start_log_listener(*handlers: logging.Handler) -> None:
+    """
+    Write worker processes' log records with these handlers of the API
+    process. Call before the pool starts, and stop_log_listener at exit.
+    """
+    global _log_queue, _log_listener
+    _log_queue = _mp_context.Queue()
+    _log_listener = logging.handlers.QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    _log_listener.start()
+
+
+def stop_log_listener() -> None:
+    global _log_queue, _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+    _log_queue = None
+
+
+def _init_worker(log_queue: Optional[multiprocessing.Queue]) -> None:
+    # Send records to the API process's listener; drop any handlers a worker
+    # may have picked up, since nothing in the worker would write them
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    if log_queue is not None:
+        root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    else:
+        root_logger.addHandler(logging.StreamHandler())
+    setup_freecad()
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Create the pool on first use so importing the app does not spawn processes"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=CAD_WORKERS,
+            mp_context=_mp_context,
+            initializer=_init_worker,
+            initargs=(_log_queue,)
+        )
+        logger.info(f"Started CAD process pool with {CAD_WORKERS} workers")
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+
+async def run_in_worker(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
+
+
+async def get_grid(width: float, depth: float) -> GridResult:
+    """
+    Grid layout for a drawer size. Common sizes repeat, so results are kept in
+    an LRU cache in this process; misses are computed in the process pool.
+    """
+    key = (round(width, 3), round(depth, 3))
+    result = _grid_cache.get(key)
+    if result is not None:
+        _grid_cache.move_to_end(key)
+        return result
+
+    result = await run_in_worker(compute_grid, width, depth)
+    _grid_cache[key] = result
+    if len(_grid_cache) > GRID_CACHE_SIZE:
+        _grid_cache.popitem(last=False)
+    return result
+
+
+def compute_grid(width: float, depth: float) -> GridResult:
+    """Divide a drawer into grid units; returns (units, grid size x, grid size y)"""
+    from core.gridfinity_baseplate import GridfinityBaseplate
+
+    baseplate = GridfinityBaseplate(drawer_width=width, drawer_depth=depth, config=GRID_CONFIG)
+    units = tuple(
+        (unit.width, unit.depth, unit.x_offset, unit.y_offset, unit.is_standard)
+        for unit in baseplate.grid_divider()
+    )
+    return units, baseplate.num_squares_x, baseplate.num_squares_y
+
+
+def render_bin(width: float, depth: float, height: float, output_dir: str) -> Tuple[str, str]:
+    """Build a bin and export it; returns (FCStd path, STL path)"""
+    import FreeCAD
+    from core.gridfinity_custom_bin import GridfinityCustomBin
+
+    bin_maker = GridfinityCustomBin()
+    doc, fcstd_path, stl_path = bin_maker.create_bin(width, depth, height, output_dir)
+    # Workers are long-lived, so don't let documents pile up between jobs
+    FreeCAD.closeDocument(doc.Name)
+    return str(fcstd_path), str(stl_path)
+
+
+def render_baseplate(width: float, depth: float, output_dir: str) -> Tuple[str, ...]:
+    """Build and export the printable sections of a baseplate; returns the section names"""
+    from core.gridfinity_baseplate import GridfinityBaseplate
+
+    baseplate_maker = GridfinityBaseplate(drawer_depth=depth, drawer_width=width)
+    sections = baseplate_maker.generate_baseplate(output_dir)
+    return tuple(section_name for section_name, dimensions in sections)
@@ -1,5 +1,6 @@
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List
 from .. import models, schemas
 from ..utils import StorageManager, storage
 import logging
@@ -8,83 +9,106 @@ logger = logging.getLogger(__name__)
 
 
 class ModelService:
-    def __init__(self, db: Session):
-        self.db = db
+    """
+    Lists and deletes models. Holds no per-request state, so one instance is
+    shared; callers pass their database session to each method.
+    """
+    def __init__(self):
         self.storage = StorageManager()  # Initialize storage manager
 
-    def retrieve_models(self) -> List[schemas.ModelResponse]:
-        logger.info("Retrieving all models")
-        bins = self.db.query(models.Bin).all()
-        baseplates = self.db.query(models.Baseplate).all()
+    async def retrieve_models(self, db: AsyncSession, file_url_prefix: str = "") -> List[Dict[str, Any]]:
+        """
+        List every bin and baseplate with the URL of its STL file.
+        Only the needed columns are selected, so no ORM objects are built;
+        file_url_prefix is prepended to each stored relative path.
+        """
+        logger.debug("Retrieving all models")
 
-        models_list = []
-        logger.info(f"Found {len(bins)} bins and {len(baseplates)} baseplates")
+        def stl_path(model_id):
+            # Files hang off the shared Model record; match STL in either case
+            return (
+                select(models.GeneratedFile.file_path)
+                .where(
+                    models.GeneratedFile.model_id == model_id,
+                    func.upper(models.GeneratedFile.file_type) == "STL"
+                )
+                .limit(1)
+                .scalar_subquery()
+            )
 
-        # Process bins
-        for bin in bins:
-            # Check for STL files with both uppercase and lowercase
-            stl_file = next((f for f in bin.files if f.file_type.upper() == "STL"), None)
-            
-            if not stl_file:
-                logger.warning(f"Bin {bin.id} ({bin.name}) has no STL file")
-                # Log all available files to help diagnose the issue
-                if bin.files:
-                    logger.info(f"Available files for bin {bin.id}: {[f.file_type for f in bin.files]}")
-            else:
-                logger.debug(f"Bin {bin.id} has STL file: {stl_file.file_path}")
-                
-            models_list.append(schemas.ModelResponse(
-                id=str(bin.id),
-                type="bin",
-                name=bin.name or f"Bin_{bin.id}",  # Provide a fallback name if None
-                date_created=bin.created_at,
-                width=bin.width,
-                depth=bin.depth,
-                height=bin.height,
-                file_path=stl_file.file_path if stl_file else None
-            ))
+        bin_rows = (await db.execute(select(
+            models.Bin.id,
+            models.Bin.name,
+            models.Bin.created_at,
+            models.Bin.width,
+            models.Bin.depth,
+            models.Bin.height,
+            stl_path(models.Bin.model_id).label("file_path")
+        ))).all()
+        baseplate_rows = (await db.execute(select(
+            models.Baseplate.id,
+            models.Baseplate.name,
+            models.Baseplate.created_at,
+            models.Baseplate.width,
+            models.Baseplate.depth,
+            stl_path(models.Baseplate.model_id).label("file_path")
+        ))).all()
+        logger.debug("Found %d bins and %d baseplates", len(bin_rows), len(baseplate_rows))
 
-        # Process baseplates
-        for baseplate in baseplates:
-            # Check for STL files with both uppercase and lowercase
-            stl_file = next((f for f in baseplate.files if f.file_type.upper() == "STL"), None)
-            
-            if not stl_file:
-                logger.warning(f"Baseplate {baseplate.id} ({baseplate.name}) has no STL file")
-                # Log all available files to help diagnose the issue
-                if baseplate.files:
-                    logger.info(f"Available files for baseplate {baseplate.id}: {[f.file_type for f in baseplate.files]}")
-            else:
-                logger.debug(f"Baseplate {baseplate.id} has STL file: {stl_file.file_path}")
-                
-            models_list.append(schemas.ModelResponse(
-                id=str(baseplate.id),
-                type="baseplate",
-                name=baseplate.name or f"Baseplate_{baseplate.id}",  # Provide a fallback name if None
-                date_created=baseplate.created_at,
-                width=baseplate.width,
-                depth=baseplate.depth,
-                height=0,  # Baseplates don't have height
-                file_path=stl_file.file_path if stl_file else None
-            ))
+        def file_url(file_path):
+            # Paths that are already URLs are passed through unchanged
+            if not file_path or file_path.startswith(("http://", "https://")):
+                return file_path
+            return file_url_prefix + file_path.lstrip('/')
+
+        models_list = [
+            {
+                "id": str(row.id),
+                "type": "bin",
+                "name": row.name or f"Bin_{row.id}",  # Provide a fallback name if None
+                "date_created": row.created_at,
+                "width": row.width,
+                "depth": row.depth,
+                "height": row.height,
+                "file_path": file_url(row.file_path)
+            }
+            for row in bin_rows
+        ]
+        models_list += [
+            {
+                "id": str(row.id),
+                "type": "baseplate",
+                "name": row.name or f"Baseplate_{row.id}",  # Provide a fallback name if None
+                "date_created": row.created_at,
+                "width": row.width,
+                "depth": row.depth,
+                "height": 0,  # Baseplates don't have height
+                "file_path": file_url(row.file_path)
+            }
+            for row in baseplate_rows
+        ]
+
+        missing = sum(1 for model in models_list if model["file_path"] is None)
+        if missing:
+            logger.warning(f"{missing} models have no STL file")
 
         return models_list
 
-    def delete_model(self, model_id: str) -> bool:
+    async def delete_model(self, db: AsyncSession, model_id: str) -> bool:
         # Try to find and delete bin
-        bin = self.db.query(models.Bin).filter(models.Bin.id == model_id).first()
+        bin = await db.scalar(select(models.Bin).where(models.Bin.id == model_id).limit(1))
         if bin:
             self.storage.delete_model_files("bins", bin.id)  # Use self.storage instead of storage
-            self.db.delete(bin)
-            self.db.commit()
+            await db.delete(bin)
+            await db.commit()
             return True
 
         # Try to find and delete baseplate
-        baseplate = self.db.query(models.Baseplate).filter(models.Baseplate.id == model_id).first()
+        baseplate = await db.scalar(select(models.Baseplate).where(models.Baseplate.id == model_id).limit(1))
         if baseplate:
             self.storage.delete_model_files("baseplates", baseplate.id)  # Use self.storage instead of storage
-            self.db.delete(baseplate)
-            self.db.commit()
+            await db.delete(baseplate)
+            await db.commit()
             return True
 
         return False
\ No newline at end of file
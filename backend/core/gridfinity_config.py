@@ -29,9 +29,10 @@ class GridfinityConfig:
     BOTTOM_THICKNESS: float = 0.8
 
     # File paths and storage
+    # Defaults to the API's MODEL_OUTPUT_DIR, then backend/model-output
     BASE_OUTPUT_DIR: Path = Path(os.getenv(
         "GRIDFINITY_OUTPUT_DIR",
-        "/home/ron-maxseiner/PycharmProjects/drawerfinity/model-output"
+        os.getenv("MODEL_OUTPUT_DIR", str(Path(__file__).resolve().parent.parent / "model-output"))
     ))
     TEMP_DIR: Path = Path("/tmp")
 
@@ -1,4 +1,5 @@
-from app.database import Base, get_db, engine
+from sqlalchemy import select
+from app.database import Base, SessionLocal, engine
 from app.models import User, Drawer, Bin, Baseplate, Model
 from app.services.bin_generation_service import BinGenerationService
 from pathlib import Path
@@ -6,22 +7,23 @@ import asyncio
 
 async def test_bin_reuse():
     # Create database tables
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     print('Database tables created')
     
     # Get database session
-    db = next(get_db())
+    db = SessionLocal()
     
     # Create bin generation service
-    bin_service = BinGenerationService(db, Path('generated_files'))
+    bin_service = BinGenerationService(Path('generated_files'))
     
     # Generate a bin with specific dimensions
-    bin1, files1 = await bin_service.generate_bin('TestBin1', 42.0, 42.0, 25.0)
+    bin1, files1 = await bin_service.generate_bin(db, 'TestBin1', 42.0, 42.0, 25.0, drawer_id=None)
     print(f'First bin generated: id={bin1.id}, model_id={bin1.model_id}')
     print(f'Files generated: {len(files1)}')
     
     # Generate another bin with the same dimensions
-    bin2, files2 = await bin_service.generate_bin('TestBin2', 42.0, 42.0, 25.0)
+    bin2, files2 = await bin_service.generate_bin(db, 'TestBin2', 42.0, 42.0, 25.0, drawer_id=None)
     print(f'Second bin generated: id={bin2.id}, model_id={bin2.model_id}')
     print(f'Files generated: {len(files2)}')
     
@@ -32,7 +34,7 @@ async def test_bin_reuse():
         print('Model reuse FAILED: Bins are using different models')
     
     # Generate a bin with different dimensions
-    bin3, files3 = await bin_service.generate_bin('TestBin3', 84.0, 42.0, 25.0)
+    bin3, files3 = await bin_service.generate_bin(db, 'TestBin3', 84.0, 42.0, 25.0, drawer_id=None)
     print(f'Third bin generated (different dimensions): id={bin3.id}, model_id={bin3.model_id}')
     print(f'Files generated: {len(files3)}')
     
@@ -43,7 +45,7 @@ async def test_bin_reuse():
         print('Dimension check FAILED: Different dimensions resulted in the same model')
     
     # Query all models
-    models = db.query(Model).all()
+    models = (await db.scalars(select(Model))).all()
     print(f'Total models in database: {len(models)}')
     for i, model in enumerate(models):
         print(f'Model {i+1}: id={model.id}, type={model.type}, metadata={model.model_metadata}')
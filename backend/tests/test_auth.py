@@ -22,4 +22,53 @@ def test_login_invalid_credentials(client):
             "grant_type": "password"
         }
     )
-    assert response.status_code == 401
\ No newline at end of file
+    assert response.status_code == 401
+
+
+def test_old_password_rejected_after_change_password(client, test_user):
+    # The first login is cached, so this also checks the cache entry is dropped
+    response = client.post(
+        "/token",
+        data={"username": test_user.username, "password": "testpass123", "grant_type": "password"}
+    )
+    assert response.status_code == 200
+    token = response.json()["access_token"]
+
+    response = client.post(
+        "/users/change-password/",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"current_password": "testpass123", "new_password": "newpass456"}
+    )
+    assert response.status_code == 200
+
+    response = client.post(
+        "/token",
+        data={"username": test_user.username, "password": "testpass123", "grant_type": "password"}
+    )
+    assert response.status_code == 401
+
+    response = client.post(
+        "/token",
+        data={"username": test_user.username, "password": "newpass456", "grant_type": "password"}
+    )
+    assert response.status_code == 200
+
+
+def test_cached_login_rejected_after_password_changed_elsewhere(client, test_user, db_session):
+    from app.utils.password import get_password_hash
+
+    response = client.post(
+        "/token",
+        data={"username": test_user.username, "password": "testpass123", "grant_type": "password"}
+    )
+    assert response.status_code == 200
+
+    # A change made by another worker process does not clear this process's login cache
+    test_user.hashed_password = get_password_hash("newpass456")
+    db_session.commit()
+
+    response = client.post(
+        "/token",
+        data={"username": test_user.username, "password": "testpass123", "grant_type": "password"}
+    )
+    assert response.status_code == 401
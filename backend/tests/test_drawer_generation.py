@@ -0,0 +1,101 @@
+import uuid
+from fastapi import status
+from app import main
+from app.models import User
+from app.utils.password import get_password_hash
+from tests.test_user_api import create_test_drawer, get_auth_token
+
+def generate_request(drawer_id=0, name="Background Drawer"):
+    """Body for /drawers/generate-models/; drawer_id 0 creates a new drawer"""
+    return {
+        "name": name,
+        "width": 200,
+        "depth": 300,
+        "height": 100,
+        "drawer_id": drawer_id,
+        "bins": []
+    }
+
+def test_background_generation_pending_then_ready(client, test_user, background_db, monkeypatch):
+    """Test that a background generation is pending while it runs and ready after"""
+    statuses_during_job = []
+
+    # Model rendering needs FreeCAD; only the status transitions are under test here
+    async def fake_generate_drawer_contents(db, drawer, request):
+        statuses_during_job.append(drawer.generation_status)
+        return ["1", "2"]
+
+    monkeypatch.setattr(main, "_generate_drawer_contents", fake_generate_drawer_contents)
+
+    token = get_auth_token(client, test_user.username, "testpass123")
+    assert token is not None
+
+    # TestClient runs background tasks before returning the response
+    response = client.post(
+        "/drawers/generate-models/",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"background": "true"},
+        json=generate_request()
+    )
+    assert response.status_code == 200, f"Failed with status {response.status_code}: {response.text}"
+    data = response.json()
+    assert data["modelIds"] == []
+    drawer_id = data["jobId"]
+    assert drawer_id is not None
+
+    assert statuses_during_job == ["pending"]
+
+    response = client.get(
+        f"/drawers/{drawer_id}/generation-status",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert response.json() == {"drawer_id": drawer_id, "status": "ready"}
+
+def test_background_generation_failure_marks_drawer_failed(client, test_user, background_db, monkeypatch):
+    """Test that an error in the background job leaves the drawer marked failed"""
+    async def failing_generate_drawer_contents(db, drawer, request):
+        raise RuntimeError("render failed")
+
+    monkeypatch.setattr(main, "_generate_drawer_contents", failing_generate_drawer_contents)
+
+    token = get_auth_token(client, test_user.username, "testpass123")
+    assert token is not None
+
+    response = client.post(
+        "/drawers/generate-models/",
+        headers={"Authorization": f"Bearer {token}"},
+        params={"background": "true"},
+        json=generate_request()
+    )
+    # The request itself succeeded; the failure is reported through the status
+    assert response.status_code == 200, f"Failed with status {response.status_code}: {response.text}"
+    drawer_id = response.json()["jobId"]
+
+    response = client.get(
+        f"/drawers/{drawer_id}/generation-status",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["status"] == "failed"
+
+def test_generation_status_of_other_users_drawer(client, test_user, db_session):
+    """Test that the generation status of another user's drawer is not found"""
+    unique_id = str(uuid.uuid4())[:8]
+    other_user = User(
+        email=f"other_{unique_id}@example.com",
+        username=f"otheruser_{unique_id}",
+        hashed_password=get_password_hash("otherpass123")
+    )
+    db_session.add(other_user)
+    db_session.commit()
+    other_drawer = create_test_drawer(db_session, other_user.id, "Other Drawer")
+
+    token = get_auth_token(client, test_user.username, "testpass123")
+    assert token is not None
+
+    response = client.get(
+        f"/drawers/{other_drawer.id}/generation-status",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,83 @@
+import asyncio
+
+from app.middleware import CacheControlMiddleware, QueryFilterMiddleware
+
+
+def run_middleware(query_string, scope_type="http", path="/models/"):
+    """Run QueryFilterMiddleware over a scope and return the scope the app received"""
+    received = {}
+
+    async def downstream(scope, receive, send):
+        received["scope"] = scope
+
+    scope = {"type": scope_type, "path": path, "query_string": query_string}
+    asyncio.run(QueryFilterMiddleware(downstream)(scope, None, None))
+    return received["scope"]
+
+
+def test_filters_local_kw():
+    scope = run_middleware(b"skip=0&local_kw=test&limit=10")
+    assert scope["query_string"] == b"skip=0&limit=10"
+
+
+def test_filters_local_kw_without_value():
+    scope = run_middleware(b"local_kw&limit=10")
+    assert scope["query_string"] == b"limit=10"
+
+
+def test_keeps_similar_names_and_encoding():
+    query_string = b"local_kwargs=1&name=a%26b+c"
+    scope = run_middleware(query_string)
+    assert scope["query_string"] == query_string
+
+
+def test_passes_unchanged_scope_through():
+    scope = {"type": "http", "path": "/models/", "query_string": b"skip=0"}
+    received = {}
+
+    async def downstream(inner_scope, receive, send):
+        received["scope"] = inner_scope
+
+    asyncio.run(QueryFilterMiddleware(downstream)(scope, None, None))
+    assert received["scope"] is scope
+
+
+def test_ignores_non_http_scopes():
+    scope = run_middleware(b"local_kw=test", scope_type="websocket")
+    assert scope["query_string"] == b"local_kw=test"
+
+
+def test_skips_file_routes():
+    scope = run_middleware(b"local_kw=test", path="/files/bin_1/bin.stl")
+    assert scope["query_string"] == b"local_kw=test"
+
+
+def run_cache_control(path, status=200, headers=()):
+    """Run CacheControlMiddleware for a response and return the headers that were sent"""
+    sent = []
+
+    async def downstream(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": list(headers)})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "path": path}
+    asyncio.run(CacheControlMiddleware(downstream, path_prefix="/files/")(scope, None, send))
+    return sent[0]["headers"]
+
+
+def test_adds_cache_control_under_prefix():
+    headers = run_cache_control("/files/bin_1/bin.stl")
+    assert (b"cache-control", b"public, max-age=3600") in headers
+
+
+def test_skips_other_paths_and_errors():
+    assert run_cache_control("/models/") == []
+    assert run_cache_control("/files/missing.stl", status=404) == []
+
+
+def test_keeps_existing_cache_control():
+    headers = run_cache_control("/files/bin_1/bin.stl", headers=[(b"cache-control", b"no-store")])
+    assert headers == [(b"cache-control", b"no-store")]
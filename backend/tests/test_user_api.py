@@ -1,5 +1,8 @@
 import json
+import pytest
 from fastapi import status
+from app.cache import token_key
+from app.config import settings
 from app.models import Drawer
 
 def get_auth_token(client, username, password):
@@ -198,6 +201,32 @@ def test_get_user_drawers_endpoint(client, test_user, db_session):
     assert found_drawer1, "Kitchen Drawer not found in response"
     assert found_drawer2, "Office Drawer not found in response"
 
+def test_get_user_drawers_query_count(client, test_user, db_session, query_counter):
+    """Test that listing drawers does not issue one query per drawer"""
+    from app.models import Bin
+
+    # Create several drawers, each with a bin
+    for i in range(3):
+        drawer = create_test_drawer(db_session, test_user.id, f"Drawer {i}")
+        db_session.add(Bin(width=42, depth=42, height=50, drawer_id=drawer.id))
+    db_session.commit()
+
+    token = get_auth_token(client, test_user.username, "testpass123")
+    assert token is not None
+
+    query_counter.clear()
+    response = client.get(
+        "/drawers/",
+        headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.status_code == 200
+    drawers_data = response.json()
+    assert len(drawers_data) == 3
+    assert all(len(drawer["bins"]) == 1 for drawer in drawers_data)
+
+    # Current user, then drawers joined with their bins, regardless of drawer count
+    assert len(query_counter) <= 2, f"Too many queries: {query_counter}"
+
 def test_drawer_format_matches_frontend_expectation(client, test_user, db_session):
     """Test that the drawer response format matches what the frontend expects"""
     # Create a test drawer for the user
@@ -246,4 +275,69 @@ def test_drawer_format_matches_frontend_expectation(client, test_user, db_sessio
             if expected_type in (int, float) and isinstance(actual_value, (int, float)):
                 pass  # This is fine
             else:
-                assert isinstance(actual_value, expected_type), f"Field {key} has type {type(actual_value)} but expected {expected_type}"
\ No newline at end of file
+                assert isinstance(actual_value, expected_type), f"Field {key} has type {type(actual_value)} but expected {expected_type}"
+
+def test_profile_update_visible_after_user_cached(client, test_user):
+    """Test that a profile change is not hidden by the cached user of a token"""
+    token = get_auth_token(client, test_user.username, "testpass123")
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # With REDIS_URL set, this caches the user for the token
+    response = client.get("/users/me/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Test"
+
+    response = client.put("/users/update-profile/", headers=headers, json={"first_name": "Changed"})
+    assert response.status_code == 200
+
+    response = client.get("/users/me/", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["first_name"] == "Changed"
+
+@pytest.mark.skipif(not settings.REDIS_URL, reason="user cache is disabled without REDIS_URL")
+def test_cached_token_dropped_after_change_password(client, test_user):
+    """Test that changing the password removes the user's cached tokens from Redis"""
+    import redis
+
+    token = get_auth_token(client, test_user.username, "testpass123")
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+    redis_client = redis.Redis.from_url(settings.REDIS_URL)
+
+    response = client.get("/users/me/", headers=headers)
+    assert response.status_code == 200
+    assert redis_client.exists(token_key(token))
+
+    response = client.post(
+        "/users/change-password/",
+        headers=headers,
+        json={"current_password": "testpass123", "new_password": "newpass456"}
+    )
+    assert response.status_code == 200
+    assert not redis_client.exists(token_key(token))
+
+def test_bins_of_deleted_drawer_not_found(client, test_user, db_session):
+    """Test that bin endpoints return 404 once the drawer is deleted"""
+    drawer = create_test_drawer(db_session, test_user.id)
+
+    token = get_auth_token(client, test_user.username, "testpass123")
+    assert token is not None
+    headers = {"Authorization": f"Bearer {token}"}
+
+    # Check ownership once before the delete, as an edit session would
+    response = client.put(f"/drawers/{drawer.id}/bins", headers=headers, json={"bins": []})
+    assert response.status_code == 200
+
+    response = client.delete(f"/drawers/{drawer.id}", headers=headers)
+    assert response.status_code == 200
+
+    response = client.post(
+        f"/drawers/{drawer.id}/bins/",
+        headers=headers,
+        json={"width": 42, "depth": 42, "height": 50, "is_standard": True, "drawer_id": drawer.id}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = client.put(f"/drawers/{drawer.id}/bins", headers=headers, json={"bins": []})
+    assert response.status_code == status.HTTP_404_NOT_FOUND